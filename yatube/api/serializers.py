@@ -0,0 +1,92 @@
+"""Ресурсы API: поля ответа и колонки, из которых они берутся.
+
+Ресурс сериализуется из строк .values(), объекты моделей не создаются.
+Выбираются только колонки запрошенных полей (?fields=) и ключей,
+по которым листает пагинатор.
+"""
+from posts.models import Post
+
+
+class FieldsError(ValueError):
+    """В ?fields= есть поле, которого у ресурса нет."""
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+class Resource:
+    """Поля ресурса: имя в ответе -> путь в ORM для .values()."""
+
+    def __init__(self, fields, keys=('id',), converters=None):
+        self.fields = fields
+        self.keys = keys
+        self.converters = converters or {}
+
+    def parse_fields(self, value):
+        """Поля из ?fields=id,text; без параметра — все поля ресурса."""
+        if not value:
+            return list(self.fields)
+        names = list(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+        return names
+
+    def values(self, queryset, names):
+        lookups = dict.fromkeys(
+            [self.fields[name] for name in names] + list(self.keys)
+        )
+        return queryset.values(*lookups)
+
+    def serialize(self, row, names):
+        data = {}
+        for name in names:
+            value = row[self.fields[name]]
+            converter = self.converters.get(name)
+            data[name] = converter(value) if converter else value
+        return data
+
+
+POSTS = Resource(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    },
+    keys=('id', 'pub_date'),
+    converters={'image': image_url},
+)
+
+COMMENTS = Resource(
+    {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'pub_date': 'pub_date',
+    },
+    keys=('id', 'pub_date'),
+)
+
+GROUPS = Resource({
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+})
+
+FOLLOWS = Resource({
+    'id': 'id',
+    'user': 'user__username',
+    'author': 'author__username',
+})
@@ -0,0 +1,96 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='title', slug='slug', description='description'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_list_pages_with_sparse_fields(self):
+        """Поля из ?fields=, страницы по курсору, один запрос на страницу."""
+        url = reverse('api:v1:post_list')
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, {'fields': 'text,group', 'limit': 2}
+            )
+        data = response.json()
+        self.assertEqual(data['results'], [
+            {'text': 'Пост 2', 'group': 'slug'},
+            {'text': 'Пост 1', 'group': 'slug'},
+        ])
+        data = self.client.get(url, {
+            'fields': 'id', 'limit': 2, 'cursor': data['next_cursor']
+        }).json()
+        self.assertEqual(data['results'], [{'id': self.posts[0].id}])
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.client.get(url, {'fields': 'text,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_not_modified(self):
+        url = reverse('api:v1:post_detail', args=(self.posts[0].id,))
+        response = self.client.get(url)
+        self.assertEqual(response.json()['author'], 'auth')
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_comments_groups_and_follows(self):
+        post = self.posts[0]
+        data = self.client.get(
+            reverse('api:v1:comment_list', args=(post.id,))
+        ).json()
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+        response = self.client.get(
+            reverse('api:v1:comment_list', args=(self.posts[-1].id + 1,))
+        )
+        self.assertEqual(response.status_code, 404)
+
+        data = self.client.get(
+            reverse('api:v1:group_list'), {'fields': 'slug'}
+        ).json()
+        self.assertEqual(data['results'], [{'slug': 'slug'}])
+        huge_id = base64.urlsafe_b64encode(b'id|' + b'9' * 30).decode()
+        response = self.client.get(
+            reverse('api:v1:group_list'), {'cursor': huge_id}
+        )
+        self.assertEqual(response.json()['results'][0]['slug'], 'slug')
+
+        url = reverse('api:v1:follow_list')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=self.author)
+        self.client.force_login(follower)
+        data = self.client.get(url).json()
+        self.assertEqual(
+            data['results'][0], {
+                'id': data['results'][0]['id'],
+                'user': 'follower',
+                'author': 'auth',
+            }
+        )
@@ -0,0 +1,157 @@
+import hashlib
+from functools import wraps
+
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from posts.conditional import patch_feed_cache
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import CursorPaginator, decode_token, encode_token, parse_id
+
+from .serializers import COMMENTS, FOLLOWS, GROUPS, POSTS, FieldsError
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def error(message, status):
+    return JsonResponse(
+        {'error': message}, status=status,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def api_view(view):
+    """Представление API возвращает данные, ответ собирается здесь.
+
+    ETag — хэш тела ответа: на совпадение с If-None-Match клиент
+    получает 304 без тела, анонимные ответы может кэшировать прокси.
+    """
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except FieldsError as exc:
+            return error(str(exc), 400)
+        if isinstance(data, HttpResponse):
+            return data
+        response = JsonResponse(
+            data, json_dumps_params={'ensure_ascii': False}
+        )
+        etag = quote_etag(hashlib.md5(response.content).hexdigest())
+        response = get_conditional_response(
+            request, etag=etag, response=response
+        ) or response
+        response['ETag'] = etag
+        patch_feed_cache(request, response)
+        return response
+    return wrapper
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def cursor_list(request, resource, queryset):
+    """Страница по (pub_date, id) с теми же курсорами, что у HTML-лент."""
+    names = resource.parse_fields(request.GET.get('fields'))
+    page = CursorPaginator(
+        resource.values(queryset, names), page_size(request)
+    ).get_cursor_page(request.GET.get('cursor'))
+    return {
+        'results': [resource.serialize(row, names) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+def encode_id_cursor(pk):
+    return encode_token('id', pk)
+
+
+def decode_id_cursor(token):
+    parts = decode_token(token)
+    if parts is None or len(parts) != 2 or parts[0] != 'id':
+        return None
+    try:
+        return parse_id(parts[1])
+    except ValueError:
+        return None
+
+
+def id_list(request, resource, queryset):
+    """Страница по возрастанию id для ресурсов без даты публикации."""
+    names = resource.parse_fields(request.GET.get('fields'))
+    limit = page_size(request)
+    queryset = resource.values(queryset, names).order_by('id')
+    after = decode_id_cursor(request.GET.get('cursor', ''))
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    rows = list(queryset[:limit + 1])
+    return {
+        'results': [resource.serialize(row, names) for row in rows[:limit]],
+        'next_cursor': (
+            encode_id_cursor(rows[limit - 1]['id'])
+            if len(rows) > limit else None
+        ),
+    }
+
+
+def detail(request, resource, queryset):
+    names = resource.parse_fields(request.GET.get('fields'))
+    row = resource.values(queryset, names).first()
+    if row is None:
+        return error('Не найдено', 404)
+    return resource.serialize(row, names)
+
+
+@api_view
+def post_list(request):
+    queryset = Post.objects.all()
+    if 'group' in request.GET:
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return cursor_list(request, POSTS, queryset)
+
+
+@api_view
+def post_detail(request, post_id):
+    return detail(request, POSTS, Post.objects.filter(id=post_id))
+
+
+@api_view
+def comment_list(request, post_id):
+    data = cursor_list(
+        request, COMMENTS, Comment.objects.filter(post_id=post_id)
+    )
+    if not data['results'] and not Post.objects.filter(id=post_id).exists():
+        return error('Не найдено', 404)
+    return data
+
+
+@api_view
+def group_list(request):
+    return id_list(request, GROUPS, Group.objects.all())
+
+
+@api_view
+def group_detail(request, slug):
+    return detail(request, GROUPS, Group.objects.filter(slug=slug))
+
+
+@api_view
+def follow_list(request):
+    """Подписки текущего пользователя."""
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', 401)
+    return id_list(
+        request, FOLLOWS, Follow.objects.filter(user=request.user)
+    )
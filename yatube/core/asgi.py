@@ -0,0 +1,167 @@
+"""ASGI-обёртка над WSGI-приложением Django.
+
+Django 2.2 не умеет асинхронных представлений и ASGI-обработчика, поэтому
+асинхронный путь устроен так: цикл событий принимает соединения и целиком
+читает тело запроса, само представление (ORM и отрисовка шаблонов)
+выполняется в ограниченном пуле потоков, а готовый ответ отдаётся клиенту
+уже из цикла. Медленный клиент держит корутину, а не поток пула.
+
+Потоковые ответы (StreamingHttpResponse) читаются и отправляются из того
+же потока пула: генератор может держать курсор базы, привязанный
+к потоку, а ожидание отправки даёт обратное давление на генератор.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.http import StreamingHttpResponse
+
+# Тело запроса до этого размера держим в памяти, больше — во временном файле.
+MAX_BODY_IN_MEMORY = 2 ** 20
+
+
+def build_environ(scope, body):
+    """WSGI environ из HTTP-scope ASGI 3.
+
+    CONTENT_LENGTH берётся из размера прочитанного тела, а не из
+    заголовка: при chunked-передаче заголовка нет, а Django без него
+    не читает тело. Путь в scope включает root_path, в PATH_INFO
+    остаётся только часть после него.
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    root_path, path = scope.get('root_path', ''), scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin1'),
+        'PATH_INFO': path.encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = (
+            scope['client'][0], str(scope['client'][1])
+        )
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # HTTP/2 присылает каждую куку отдельным заголовком.
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    body.seek(0, 2)
+    environ['CONTENT_LENGTH'] = str(body.tell())
+    body.seek(0)
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI 3-приложение, выполняющее WSGI-приложение в пуле потоков."""
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(
+                f'Неподдерживаемый тип соединения {scope["type"]}'
+            )
+        body = await self.read_body(receive)
+        environ = build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        try:
+            start, chunks = await loop.run_in_executor(
+                self.executor, self.run_wsgi, environ, send, loop
+            )
+        finally:
+            body.close()
+        if start is None:
+            return
+        await send(start)
+        await send({
+            'type': 'http.response.body',
+            'body': b''.join(chunks),
+        })
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def run_wsgi(self, environ, send, loop):
+        """Вызывает WSGI-приложение в потоке пула.
+
+        Обычный ответ возвращается целиком и отправляется циклом.
+        Потоковый отправляется отсюда, тогда возвращается (None, None).
+        """
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            })
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            if not isinstance(result, StreamingHttpResponse):
+                return start, list(result)
+            send_from_thread(start)
+            for chunk in result:
+                if chunk:
+                    send_from_thread({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_from_thread({'type': 'http.response.body', 'body': b''})
+            return None, None
+        finally:
+            # Django закрывает соединения с базой в request_finished,
+            # поэтому close() вызывается в том же потоке, что и запрос.
+            if hasattr(result, 'close'):
+                result.close()
@@ -0,0 +1,8 @@
+"""SQLite с пулом соединений: ENGINE 'core.db.backends.sqlite3'."""
+from django.db.backends.sqlite3 import base
+
+from core.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
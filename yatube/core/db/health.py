@@ -0,0 +1,20 @@
+"""Проверка постоянных соединений (CONN_MAX_AGE != 0) в начале запроса.
+
+Django 2.2 проверяет соединение, только если в нём уже были ошибки, и
+после перезапуска или разрыва со стороны базы первый запрос процесса
+падает. С CONN_HEALTH_CHECKS = True в описании базы соединение,
+пережившее прошлый запрос, проверяется и при необходимости закрывается:
+следующее обращение откроет новое.
+"""
+from django.db import connections
+
+
+def check_connections(**kwargs):
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
@@ -0,0 +1,203 @@
+"""Пул соединений с базой для бэкендов core.db.backends.
+
+Соединения процесса делятся между потоками: Django «закрывает»
+соединение в конце запроса (CONN_MAX_AGE = 0), а бэкенд вместо
+закрытия возвращает его в пул. Настройки пула берутся из ключа POOL
+описания базы в settings.DATABASES:
+
+* MIN_SIZE — сколько соединений открыть заранее;
+* MAX_SIZE — больше соединений не открывается, запросы ждут;
+* TIMEOUT — сколько секунд ждать свободного соединения;
+* CHECK_AFTER — соединение, пролежавшее без дела дольше этого,
+  перед выдачей проверяется запросом SELECT 1.
+
+Счётчики пула (выдачи, ожидания, таймауты) видны в pool_stats().
+"""
+import threading
+import time
+from collections import Counter, deque
+
+from django.db import OperationalError
+
+DEFAULT_POOL = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 30,
+    'CHECK_AFTER': 30,
+}
+
+
+class PoolTimeout(OperationalError):
+    """Свободное соединение не появилось за TIMEOUT секунд."""
+
+
+def ping(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class ConnectionPool:
+    """Потокобезопасный пул DB-API соединений с метриками."""
+
+    def __init__(
+        self, connect, min_size=0, max_size=10, timeout=30, check_after=30,
+        name=None,
+    ):
+        if not 0 <= min_size <= max_size:
+            raise ValueError('Нужно 0 <= MIN_SIZE <= MAX_SIZE')
+        self.connect = connect
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.stats = Counter()
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.stats['connects'] += 1
+        return connection
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self.stats['discards'] += 1
+            self._condition.notify()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'Нет свободного соединения за {self.timeout} с'
+                        )
+                    if not waited:
+                        waited = True
+                        self.stats['waits'] += 1
+                    self._condition.wait(remaining)
+                self.stats['checkouts'] += 1
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    connection = None
+            if connection is None:
+                return self._open()
+            if time.monotonic() - released_at < self.check_after:
+                return connection
+            try:
+                ping(connection)
+            except Exception:
+                with self._condition:
+                    self.stats['failed_checks'] += 1
+                self._discard(connection)
+                continue
+            return connection
+
+    def release(self, connection):
+        """Возвращает соединение; незавершённая транзакция откатывается."""
+        try:
+            connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, connection):
+        self._discard(connection)
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                **self.stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_stats():
+    """Метрики всех пулов процесса по псевдонимам баз."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """Берёт соединения бэкенда из общего пула вместо открытия новых."""
+
+    def get_pool(self, conn_params):
+        """Пул псевдонима; при смене базы (тестовая БД) создаётся новый."""
+        name = self.settings_dict['NAME']
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+            if pool is not None and pool.name != name:
+                pool.close_all()
+                pool = None
+            if pool is None:
+                options = {
+                    **DEFAULT_POOL, **self.settings_dict.get('POOL', {})
+                }
+                connect = super().get_new_connection
+                pool = _pools[self.alias] = ConnectionPool(
+                    lambda: connect(conn_params),
+                    min_size=options['MIN_SIZE'],
+                    max_size=options['MAX_SIZE'],
+                    timeout=options['TIMEOUT'],
+                    check_after=options['CHECK_AFTER'],
+                    name=name,
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool(conn_params).acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get(self.alias)
+        if pool is None or pool.name != self.settings_dict['NAME']:
+            super()._close()
+        elif self.errors_occurred and not self.is_usable():
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
@@ -0,0 +1,67 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики — псевдонимы баз из settings.DATABASE_REPLICAS. Читать с них
+можно только внутри запроса (см. core.middleware.PrimaryPinningMiddleware):
+команды, миграции и фоновые потоки работают с основной базой.
+
+Чтобы пользователь сразу видел свои записи, запрос закрепляется
+за основной базой, если он небезопасный (POST и т. п.), если с момента
+последней записи пользователя прошло меньше REPLICA_STICKY_SECONDS
+(cookie) или если в этом же запросе уже была запись. Страницы, данные
+которых менялись за последние REPLICA_STICKY_SECONDS, тоже читаются
+с основной базы (posts.cache.pin_if_recent): иначе устаревший ответ
+реплики получил бы свежие ETag и s-maxage.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+@contextmanager
+def request_scope(pinned):
+    """Рамка запроса: вне её все чтения идут в основную базу."""
+    _state.in_request, _state.pinned, _state.wrote = True, pinned, False
+    try:
+        yield _state
+    finally:
+        _state.in_request = _state.pinned = _state.wrote = False
+
+
+def pin_to_primary():
+    """Оставшиеся чтения запроса идут в основную базу."""
+    if getattr(_state, 'in_request', False):
+        _state.pinned = True
+
+
+def choose_replica():
+    if not getattr(_state, 'in_request', False) or _state.pinned:
+        return None
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return choose_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'in_request', False):
+            _state.wrote = _state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Реплики получают схему репликацией, а не миграциями."""
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
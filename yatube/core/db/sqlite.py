@@ -0,0 +1,39 @@
+"""Профили PRAGMA для SQLite, применяются к каждому новому соединению.
+
+Профиль 'production' переводит базу в WAL: читатели не ждут писателя,
+а писатель не ждёт читателей, fsync делается только при checkpoint
+(synchronous=NORMAL). Журнал WAL нужно периодически сбрасывать в базу
+и обновлять статистику планировщика — см. команду sqlite_maintenance.
+"""
+from django.conf import settings
+
+PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 2 ** 20,
+        # Отрицательное значение — размер в КиБ, а не в страницах.
+        'cache_size': -64 * 1024,
+        'temp_store': 'memory',
+    },
+}
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет PRAGMA на DB-API соединении sqlite3."""
+    cursor = connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if connection.vendor == 'sqlite':
+        apply_pragmas(
+            connection.connection, PROFILES[settings.SQLITE_PROFILE]
+        )
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db.sqlite import PROFILES, apply_pragmas
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[int(share * (len(values) - 1))] if values else 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает профили PRAGMA SQLite на отдельной временной базе: '
+        'читатели ленты против писателей комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--rows', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        for profile in ('default', 'production'):
+            with tempfile.TemporaryDirectory() as directory:
+                stats = self.run(
+                    os.path.join(directory, 'bench.sqlite3'),
+                    PROFILES[profile],
+                    options,
+                )
+            seconds = options['seconds']
+            p99 = percentile(stats['latencies'], 0.99) * 1000
+            self.stdout.write(
+                f'{profile}: чтений/с {stats["reads"] / seconds:.0f}, '
+                f'записей/с {stats["writes"] / seconds:.0f}, '
+                f'p99 чтения {p99:.1f} мс, '
+                f'ошибок блокировки {stats["busy"]}'
+            )
+
+    def connect(self, name, pragmas):
+        # Таймаут как у Django по умолчанию; профиль может его изменить.
+        connection = sqlite3.connect(
+            name, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        apply_pragmas(connection, pragmas)
+        return connection
+
+    def run(self, name, pragmas, options):
+        self.create_tables(name, pragmas, options['rows'])
+        self.stats = {'reads': 0, 'writes': 0, 'busy': 0, 'latencies': []}
+        self.lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        threads = [
+            threading.Thread(
+                target=self.reader,
+                args=(name, pragmas, deadline, i * 10 % options['rows']),
+            )
+            for i in range(options['readers'])
+        ] + [
+            threading.Thread(
+                target=self.writer, args=(name, pragmas, deadline, i + 1)
+            )
+            for i in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.stats
+
+    def create_tables(self, name, pragmas, rows):
+        setup = self.connect(name, pragmas)
+        setup.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+            'comments INTEGER NOT NULL DEFAULT 0)'
+        )
+        setup.execute(
+            'CREATE TABLE comment (id INTEGER PRIMARY KEY, '
+            'post_id INTEGER, text TEXT)'
+        )
+        setup.execute('BEGIN')
+        setup.executemany(
+            'INSERT INTO post (text) VALUES (?)',
+            ((f'пост {i} ' * 20,) for i in range(rows)),
+        )
+        setup.execute('COMMIT')
+        setup.close()
+
+    def count(self, key, latency=None):
+        with self.lock:
+            self.stats[key] += 1
+            if latency is not None:
+                self.stats['latencies'].append(latency)
+
+    def reader(self, name, pragmas, deadline, offset):
+        """Читает одну и ту же страницу ленты до конца замера."""
+        connection = self.connect(name, pragmas)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.execute(
+                    'SELECT id, text, comments FROM post '
+                    'ORDER BY id DESC LIMIT 10 OFFSET ?',
+                    [offset],
+                ).fetchall()
+            except sqlite3.OperationalError:
+                self.count('busy')
+                continue
+            self.count('reads', time.perf_counter() - started)
+        connection.close()
+
+    def writer(self, name, pragmas, deadline, post_id):
+        """Комментирует пост post_id до конца замера."""
+        connection = self.connect(name, pragmas)
+        while time.monotonic() < deadline:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT INTO comment (post_id, text) VALUES (?, ?)',
+                    [post_id, 'комментарий'],
+                )
+                connection.execute(
+                    'UPDATE post SET comments = comments + 1 WHERE id = ?',
+                    [post_id],
+                )
+                connection.execute('COMMIT')
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                self.count('busy')
+                continue
+            self.count('writes')
+        connection.close()
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Сбрасывает журнал WAL в базу SQLite (wal_checkpoint) и обновляет '
+        'статистику планировщика (optimize). С --every работает постоянно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--every',
+            type=float,
+            help='Повторять каждые столько секунд.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда только для SQLite.')
+        while True:
+            with connection.cursor() as cursor:
+                # TRUNCATE ждёт читателей и обрезает файл журнала до нуля.
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log_pages, checkpointed = cursor.fetchone()
+                cursor.execute('PRAGMA optimize')
+            self.stdout.write(
+                f'checkpoint: занято={busy}, страниц в журнале {log_pages}, '
+                f'перенесено {checkpointed}; optimize выполнен'
+            )
+            if not options['every']:
+                return
+            connection.close()
+            time.sleep(options['every'])
@@ -0,0 +1,34 @@
+from django.conf import settings
+
+from .db.routers import request_scope
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PrimaryPinningMiddleware:
+    """Закрепляет запросы пользователя за основной базой после записи.
+
+    Записавший запрос ставит cookie на REPLICA_STICKY_SECONDS, пока его
+    записи гарантированно не доехали до реплик; см. core.db.routers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in SAFE_METHODS
+            or settings.REPLICA_STICKY_COOKIE in request.COOKIES
+        )
+        with request_scope(pinned) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
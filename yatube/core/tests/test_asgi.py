@@ -0,0 +1,87 @@
+import asyncio
+import io
+from http import HTTPStatus
+
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase
+
+from core.asgi import WsgiToAsgi, build_environ
+
+
+class AsgiTests(SimpleTestCase):
+    def call(self, wsgi_application, path='/', body=b''):
+        application = WsgiToAsgi(wsgi_application, max_workers=2)
+        scope = {
+            'type': 'http',
+            'method': 'POST',
+            'path': path,
+            'query_string': b'q=1',
+            'headers': [(b'content-type', b'text/plain')],
+        }
+        chunks = [body[:2], body[2:]]
+        sent = []
+
+        async def receive():
+            return {
+                'type': 'http.request',
+                'body': chunks.pop(0),
+                'more_body': bool(chunks),
+            }
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        application.executor.shutdown()
+        return sent
+
+    def test_asgi_runs_wsgi_application(self):
+        """ASGI-вход передаёт запрос WSGI-приложению и отдаёт его ответ."""
+        def echo(environ, start_response):
+            start_response('201 Created', [
+                ('X-Path', environ['PATH_INFO']),
+                ('X-Length', environ['CONTENT_LENGTH']),
+            ])
+            return [
+                environ['QUERY_STRING'].encode(),
+                environ['wsgi.input'].read(),
+            ]
+
+        start, body = self.call(echo, '/путь/', b'hello')
+        self.assertEqual(start['status'], HTTPStatus.CREATED)
+        self.assertIn((b'x-path', '/путь/'.encode()), start['headers'])
+        self.assertIn((b'x-length', b'5'), start['headers'])
+        self.assertEqual(body['body'], b'q=1hello')
+
+    def test_asgi_streams_from_worker_thread(self):
+        """Потоковый ответ отправляется частями."""
+        def stream(environ, start_response):
+            response = StreamingHttpResponse(iter([b'a', b'b']))
+            start_response('200 OK', list(response.items()))
+            return response
+
+        messages = self.call(stream)
+        self.assertEqual(
+            [message.get('body') for message in messages[1:]],
+            [b'a', b'b', b''],
+        )
+
+    def test_environ_headers_and_root_path(self):
+        """Куки HTTP/2 склеиваются через '; ', путь — без root_path."""
+        environ = build_environ({
+            'method': 'GET',
+            'root_path': '/yatube',
+            'path': '/yatube/group/slug/',
+            'headers': [
+                (b'cookie', b'sessionid=abc'),
+                (b'cookie', b'csrftoken=def'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+            ],
+        }, io.BytesIO())
+        self.assertEqual(environ['SCRIPT_NAME'], '/yatube')
+        self.assertEqual(environ['PATH_INFO'], '/group/slug/')
+        self.assertEqual(
+            environ['HTTP_COOKIE'], 'sessionid=abc; csrftoken=def'
+        )
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
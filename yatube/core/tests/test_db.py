@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout, pool_stats
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_pool_reuses_connections_and_counts(self):
+        """Пул отдаёт освобождённые соединения и считает ожидания."""
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(':memory:', check_same_thread=False),
+            max_size=1, timeout=0.05,
+        )
+        first = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(
+            {key: pool.snapshot()[key] for key in (
+                'connects', 'checkouts', 'waits', 'timeouts', 'in_use'
+            )},
+            {
+                'connects': 1, 'checkouts': 2, 'waits': 1, 'timeouts': 1,
+                'in_use': 1,
+            },
+        )
+
+    def test_pooled_sqlite_backend(self):
+        """Бэкенд core.db.backends.sqlite3 возвращает соединение в пул."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = load_backend('core.db.backends.sqlite3').DatabaseWrapper(
+                {
+                    **connection.settings_dict,
+                    'NAME': os.path.join(directory, 'pooled.sqlite3'),
+                    'POOL': {'MAX_SIZE': 2},
+                },
+                alias='pooled',
+            )
+            for _ in range(3):
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                wrapper.close()
+            stats = pool_stats()['pooled']
+            self.assertEqual((stats['connects'], stats['checkouts']), (1, 3))
+            self.assertEqual(stats['idle'], 1)
+            wrapper.get_pool(None).close_all()
+
+
+class SqliteProfileTest(TestCase):
+    def test_production_pragmas_applied(self):
+        """Соединение SQLite открывается с PRAGMA профиля production."""
+        expected = {'synchronous': 1, 'busy_timeout': 5000, 'temp_store': 2}
+        with connection.cursor() as cursor:
+            for pragma, value in expected.items():
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+    def test_maintenance_command(self):
+        """Обслуживание выполняет checkpoint и optimize."""
+        out = StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        self.assertIn('optimize', out.getvalue())
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import PrimaryPinningMiddleware
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def request(self, method='get', cookies=None, write=False):
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+                reads.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = PrimaryPinningMiddleware(view)(request)
+        return reads, response.cookies.get(settings.REPLICA_STICKY_COOKIE)
+
+    def test_reads_go_to_replica_until_user_writes(self):
+        """Чтения идут с реплики, после записи — из основной базы."""
+        self.assertEqual(self.request(), (['replica'], None))
+
+        reads, cookie = self.request('post', write=True)
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertEqual(
+            cookie['max-age'], settings.REPLICA_STICKY_SECONDS
+        )
+
+        reads, _ = self.request(cookies={cookie.key: cookie.value})
+        self.assertEqual(reads, ['default'])
+
+        reads, cookie = self.request(write=True)
+        self.assertEqual(reads, ['replica', 'default'])
+        self.assertIsNotNone(cookie)
+
+    def test_reads_outside_request_use_primary(self):
+        """Команды и фоновые потоки читают из основной базы."""
+        self.assertEqual(router.db_for_read(Post), 'default')
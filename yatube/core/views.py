@@ -1,6 +1,10 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.shortcuts import render
 
+from .db.pool import pool_stats
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -12,3 +16,9 @@ def csrf_failure(request, reason=''):
 
 def internal_error(request):
     return render(request, 'core/500error.html')
+
+
+@staff_member_required
+def db_pool_stats(request):
+    """Метрики пулов соединений этого процесса для подбора размеров."""
+    return JsonResponse(pool_stats())
@@ -1,6 +1,8 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 
 from .models import Post, Group
+from .search import find_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,6 +18,27 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE по всей таблице.
+
+        Показываются SEARCH_MAX_RESULTS самых релевантных постов,
+        о лишних найденных админ получает предупреждение.
+        """
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        limit = settings.SEARCH_MAX_RESULTS
+        post_ids = find_posts(search_term, limit + 1)
+        if len(post_ids) > limit:
+            self.message_user(
+                request,
+                f'Найдено больше {limit} постов, показаны самые '
+                f'релевантные. Уточните запрос.',
+                messages.WARNING,
+            )
+        return queryset.filter(id__in=post_ids[:limit]), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,52 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import ImageBlob, Post
+from .thumbnails import forget
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(name, count=1):
+    """Добавляет count ссылок на файл.
+
+    Строка блокируется до конца транзакции: параллельный release
+    не удалит её между чтением и увеличением счётчика.
+    """
+    with transaction.atomic():
+        blob, created = ImageBlob.objects.select_for_update().get_or_create(
+            name=name, defaults={'refcount': count}
+        )
+        if not created:
+            blob.refcount = F('refcount') + count
+            blob.save(update_fields=['refcount'])
+
+
+def release(name):
+    """Снимает ссылку; последний владелец удаляет файл и миниатюры."""
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.refcount > 1:
+            blob.refcount = F('refcount') - 1
+            blob.save(update_fields=['refcount'])
+            return
+        blob.delete()
+    transaction.on_commit(lambda: _delete_file(name))
+
+
+def _delete_file(name):
+    # За время до коммита ту же картинку могли загрузить снова.
+    if ImageBlob.objects.filter(name=name).exists():
+        return
+    forget(name)
+    storage = Post._meta.get_field('image').storage
+    try:
+        delete_with_thumbnails(ImageFile(name, storage=storage))
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', name)
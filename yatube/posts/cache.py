@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.db.routers import pin_to_primary
+
+POSTS = 'posts'
+
+
+def _version_key(scope):
+    return f'feed_version:{scope}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def get_versions(*scopes):
+    """Поколения областей кэша.
+
+    Поколение — время последнего изменения области в наносекундах,
+    поэтому годится и для ключей, и для Last-Modified.
+    """
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def pin_if_recent(versions):
+    """Закрепляет запрос за основной базой, если области менялись недавно.
+
+    Реплика могла ещё не получить изменение, а ответ с новым поколением
+    закэшировался бы по ETag, s-maxage или ключу числа постов.
+    """
+    age = time.time_ns() - max(versions)
+    if age < settings.REPLICA_STICKY_SECONDS * 10 ** 9:
+        pin_to_primary()
+
+
+def invalidate(*scopes):
+    """Переводит области на новое поколение, старые ключи протухают."""
+    cache.set_many(
+        {_version_key(scope): time.time_ns() for scope in scopes}, None
+    )
+
+
+def invalidate_on_commit(*scopes):
+    """invalidate после коммита текущей транзакции.
+
+    Если сменить поколение раньше, параллельный запрос успеет отрисовать
+    ещё не изменённые строки под новым поколением и закэшировать их.
+    Вне транзакции срабатывает сразу.
+    """
+    transaction.on_commit(lambda: invalidate(*scopes))
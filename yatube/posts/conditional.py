@@ -0,0 +1,79 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
+
+from .cache import (
+    POSTS, follow_scope, get_versions, pin_if_recent, post_scope,
+    profile_scope
+)
+
+
+def conditional_page(get_scopes):
+    """Условный GET для страниц, которые зависят от областей posts.cache.
+
+    ETag и Last-Modified считаются по поколениям областей без запросов
+    к базе, на совпадение отвечаем 304 без отрисовки шаблона.
+    Анонимные страницы может кэшировать обратный прокси.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            versions = get_versions(*get_scopes(request, *args, **kwargs))
+            pin_if_recent(versions)
+            signature = f'{versions}:{request.user.pk}'
+            etag = quote_etag(hashlib.md5(signature.encode()).hexdigest())
+            last_modified = max(versions) // 10 ** 9
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response['ETag'] = etag
+                    response['Last-Modified'] = http_date(last_modified)
+            patch_feed_cache(request, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def patch_feed_cache(request, response):
+    """Анонимный ответ может кэшировать прокси, личный — только браузер,
+    и то с перепроверкой."""
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=0,
+            s_maxage=settings.FEED_HTTP_MAX_AGE,
+        )
+    patch_vary_headers(response, ('Cookie',))
+
+
+def index_scopes(request):
+    return [POSTS]
+
+
+def group_scopes(request, slug):
+    return [POSTS]
+
+
+def profile_scopes(request, username):
+    return [POSTS, profile_scope(username)]
+
+
+def follow_scopes(request):
+    return [POSTS, follow_scope(request.user.pk)]
+
+
+def post_scopes(request, post_id):
+    return [POSTS, post_scope(post_id)]
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump(user_id, field, delta=1):
+    """Сдвигает счётчик пользователя одним UPDATE без чтения строки."""
+    _change(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_post_comments(post_id, delta=1):
+    _change(Post.objects.filter(id=post_id), 'comments_count', delta)
+
+
+def _count(queryset, field):
+    """Подзапрос COUNT(*) строк пользователя, 0 если строк нет."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('user_id')}).order_by().values(
+                field
+            ).annotate(total=Count('id')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount():
+    """Чинит разъехавшиеся счётчики, возвращает число исправленных строк."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('id', flat=True).iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+    real = {
+        'posts_count': _count(Post.objects, 'author'),
+        'comments_count': _count(Comment.objects, 'author'),
+        'followers_count': _count(Follow.objects, 'author'),
+        'following_count': _count(Follow.objects, 'user'),
+    }
+    drifted = Q()
+    for field in real:
+        drifted |= ~Q(**{field: F(f'real_{field}')})
+    users = UserStats.objects.annotate(
+        **{f'real_{field}': value for field, value in real.items()}
+    ).filter(drifted)
+    repaired = 0
+    for stats in users.iterator():
+        for field in real:
+            setattr(stats, field, getattr(stats, f'real_{field}'))
+        stats.save(update_fields=list(real))
+        repaired += 1
+
+    posts = Post.objects.annotate(
+        real_comments_count=Coalesce(
+            Subquery(
+                Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+                    'post'
+                ).annotate(total=Count('id')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+    ).exclude(comments_count=F('real_comments_count'))
+    for post in posts.only('id').iterator():
+        Post.objects.filter(id=post.id).update(
+            comments_count=post.real_comments_count
+        )
+        repaired += 1
+    return repaired
@@ -1,6 +1,25 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Post, Comment
+from .uploads import check_limits, shrink
+
+
+def check_before_parsing(field):
+    """Проверяет загрузку по байтам и заголовку до ImageField.to_python.
+
+    to_python открывает всю картинку в Pillow и проверяет её verify();
+    слишком большой файл отклоняется раньше. Поле остаётся обычным
+    forms.ImageField, меняется только to_python этого экземпляра.
+    """
+    to_python = field.to_python
+
+    def checked(data):
+        if isinstance(data, UploadedFile):
+            check_limits(data)
+        return to_python(data)
+
+    field.to_python = checked
 
 
 class PostForm(forms.ModelForm):
@@ -16,6 +35,16 @@ class PostForm(forms.ModelForm):
                 )
             return text
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        check_before_parsing(self.fields['image'])
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+        return shrink(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta(forms.ModelForm):
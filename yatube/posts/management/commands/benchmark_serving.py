@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi, build_environ
+from posts.models import Group, Post
+
+# Адрес клиента вне INTERNAL_IPS, чтобы не замерять debug toolbar.
+CLIENT = ('192.0.2.1', 50000)
+
+
+def http_scope(url):
+    parts = urlsplit(url)
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': CLIENT,
+    }
+
+
+def percentile(latencies, share):
+    return latencies[int(share * (len(latencies) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI и ASGI пути на лентах: запросы в секунду '
+        'и хвосты задержек при одинаковом числе потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.ASGI_THREADS,
+            help='Потоков WSGI-сервера и пула ASGI-входа.',
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=0.0,
+            help='Секунд, за которые медленный клиент забирает ответ.',
+        )
+        parser.add_argument(
+            '--url', action='append', dest='urls',
+            help='Адрес для запросов, по умолчанию ленты.',
+        )
+
+    def feed_urls(self):
+        urls = [reverse('posts:index')]
+        group = Group.objects.first()
+        if group:
+            urls.append(reverse('posts:group_list', args=(group.slug,)))
+        post = Post.objects.select_related('author').first()
+        if post:
+            urls.append(reverse('posts:profile', args=(post.author,)))
+            urls.append(reverse('posts:post_detail', args=(post.id,)))
+        return urls
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or self.feed_urls()
+        plan = [urls[i % len(urls)] for i in range(options['requests'])]
+        for name, run in (('WSGI', self.run_wsgi), ('ASGI', self.run_asgi)):
+            started = time.perf_counter()
+            latencies = sorted(run(plan, options))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{name}: {len(plan) / elapsed:.1f} запросов/с, '
+                + ', '.join(
+                    f'p{round(share * 100)} '
+                    f'{percentile(latencies, share) * 1000:.1f} мс'
+                    for share in (0.5, 0.95, 0.99)
+                )
+            )
+
+    def run_wsgi(self, plan, options):
+        """Поток WSGI-сервера занят, пока клиент не заберёт ответ."""
+        application = WSGIHandler()
+        workers = threading.Semaphore(options['threads'])
+        delay = options['client_delay']
+
+        def request(url):
+            started = time.perf_counter()
+            with workers:
+                result = application(
+                    build_environ(http_scope(url), BytesIO()),
+                    lambda status, headers, exc_info=None: None,
+                )
+                try:
+                    for _ in result:
+                        pass
+                    time.sleep(delay)
+                finally:
+                    result.close()
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(options['concurrency']) as clients:
+            return list(clients.map(request, plan))
+
+    def run_asgi(self, plan, options):
+        """Медленного клиента ждёт корутина, поток пула уже свободен."""
+        application = WsgiToAsgi(WSGIHandler(), options['threads'])
+        delay = options['client_delay']
+
+        async def request(url):
+            started = time.perf_counter()
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and not message.get(
+                    'more_body'
+                ):
+                    await asyncio.sleep(delay)
+
+            await application(http_scope(url), receive, send)
+            return time.perf_counter() - started
+
+        async def main():
+            queue = iter(plan)
+            latencies = []
+
+            async def client():
+                for url in queue:
+                    latencies.append(await request(url))
+
+            await asyncio.gather(
+                *(client() for _ in range(options['concurrency']))
+            )
+            return latencies
+
+        try:
+            return asyncio.run(main())
+        finally:
+            application.executor.shutdown(wait=True)
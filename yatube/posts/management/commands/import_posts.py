@@ -0,0 +1,322 @@
+import csv
+import itertools
+import json
+import mimetypes
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import blobs, cache, counters, search, timeline
+from posts.forms import PostForm
+from posts.models import Group, Post, UserStats
+from posts.uploads import shrink
+
+User = get_user_model()
+
+
+class RowError(ValueError):
+    """Строку нельзя импортировать, она пропускается."""
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def copy_image(path):
+    """Кладёт картинку в хранилище постов, возвращает имя в нём.
+
+    Файл проходит те же проверки, что загрузка через PostForm:
+    ограничения по байтам и пикселям, разбор Pillow и уменьшение.
+    """
+    field = Post._meta.get_field('image')
+    with open(path, 'rb') as source:
+        upload = UploadedFile(
+            source,
+            name=os.path.basename(path),
+            content_type=mimetypes.guess_type(path)[0],
+            size=os.fstat(source.fileno()).st_size,
+        )
+        image = shrink(PostForm().fields['image'].clean(upload))
+        try:
+            return field.storage.save(
+                field.upload_to + os.path.basename(path), image
+            )
+        finally:
+            image.close()
+
+
+def allocate_ids(posts):
+    """Назначает id заранее, если bulk_create их не возвращает.
+
+    Из поддерживаемых баз это SQLite. Вызывается первым в транзакции:
+    пустой UPDATE берёт блокировку записи, как BEGIN IMMEDIATE, и до
+    коммита никто не вставит пост с тем же id. Новые id идут после
+    наибольшего выданного, в том числе удалённого поста: на старый id
+    могут ссылаться очередь поиска и кэш.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return
+    table = Post._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE sqlite_sequence SET seq = seq WHERE name = %s', [table]
+        )
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s', [table]
+        )
+        row = cursor.fetchone()
+    last = max(
+        row[0] if row else 0,
+        Post.objects.aggregate(last=Max('id'))['last'] or 0,
+    )
+    for offset, post in enumerate(posts, 1):
+        post.id = last + offset
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV с полями text, author, group, '
+        'pub_date и image пачками bulk_create. Миниатюры картинок потом '
+        'строит pregenerate_thumbnails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL или CSV.')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Формат файла, по умолчанию по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--images-dir',
+            help='Откуда брать картинки, по умолчанию каталог файла.',
+        )
+        parser.add_argument(
+            '--image-workers', type=int, default=4,
+            help='Число потоков, копирующих картинки.',
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать неизвестных авторов без пароля.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с числом обработанных строк для продолжения импорта.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        self.options = options
+        self.images_dir = options['images_dir'] or os.path.dirname(
+            os.path.abspath(path)
+        )
+        self.authors = {}
+        self.groups = {}
+        done = self.load_checkpoint()
+        imported = skipped = 0
+        started = time.perf_counter()
+        try:
+            stream = open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть {path}: {exc}')
+        with stream, ThreadPoolExecutor(
+            max_workers=options['image_workers']
+        ) as executor:
+            rows = itertools.islice(
+                enumerate(READERS[file_format](stream), 1), done, None
+            )
+            while True:
+                batch = list(itertools.islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                batch_imported = self.import_batch(batch, executor)
+                imported += batch_imported
+                skipped += len(batch) - batch_imported
+                done = batch[-1][0]
+                self.save_checkpoint(done)
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'Строк обработано: {done}, '
+                        f'{self.rate(imported + skipped, started)}'
+                    )
+        self.stdout.write(
+            f'Импортировано постов: {imported}, пропущено строк: {skipped} '
+            f'за {time.perf_counter() - started:.1f} с '
+            f'({self.rate(imported + skipped, started)})'
+        )
+
+    def rate(self, rows, started):
+        elapsed = time.perf_counter() - started
+        return f'{rows / elapsed if elapsed else 0:.0f} строк/с'
+
+    def load_checkpoint(self):
+        checkpoint = self.options['checkpoint']
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as stream:
+            return json.load(stream)['rows']
+
+    def save_checkpoint(self, rows):
+        checkpoint = self.options['checkpoint']
+        if not checkpoint:
+            return
+        with open(checkpoint + '.tmp', 'w') as stream:
+            json.dump({'rows': rows}, stream)
+        os.replace(checkpoint + '.tmp', checkpoint)
+
+    def resolve(self, batch):
+        """Дополняет карты автор -> id и группа -> id именами из пачки."""
+        usernames = {
+            str(row.get('author') or '') for _, row in batch if row
+        } - self.authors.keys() - {''}
+        self.authors.update(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'id'))
+        missing = usernames - self.authors.keys()
+        if missing and self.options['create_authors']:
+            User.objects.bulk_create(
+                (
+                    User(username=username, password=make_password(None))
+                    for username in missing
+                ),
+                ignore_conflicts=True,
+            )
+            created = dict(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'id'))
+            UserStats.objects.bulk_create(
+                (UserStats(user_id=user_id) for user_id in created.values()),
+                ignore_conflicts=True,
+            )
+            self.authors.update(created)
+
+        slugs = {
+            str(row.get('group') or '') for _, row in batch if row
+        } - self.groups.keys() - {''}
+        self.groups.update(Group.objects.filter(
+            slug__in=slugs
+        ).values_list('slug', 'id'))
+
+    def build_post(self, row):
+        """Пост из строки и дата публикации из неё же, если она есть."""
+        if row is None:
+            raise RowError('строка не разобрана')
+        text = str(row.get('text') or '').strip()
+        if not text:
+            raise RowError('нет текста')
+        author = str(row.get('author') or '')
+        if author not in self.authors:
+            raise RowError(f'неизвестный автор {author!r}')
+        group = str(row.get('group') or '')
+        if group and group not in self.groups:
+            raise RowError(f'неизвестная группа {group!r}')
+        pub_date = None
+        if row.get('pub_date'):
+            try:
+                pub_date = parse_datetime(str(row['pub_date']))
+            except ValueError:
+                pub_date = None
+            if pub_date is None:
+                raise RowError(f'неверная дата {row["pub_date"]!r}')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date, timezone.utc)
+        post = Post(
+            text=text,
+            author_id=self.authors[author],
+            group_id=self.groups.get(group),
+        )
+        return post, pub_date
+
+    def import_batch(self, batch, executor):
+        """Вставляет пачку в одной транзакции, возвращает число постов."""
+        self.resolve(batch)
+        ready = self.attach_images(self.build_posts(batch, executor))
+        if ready:
+            self.insert(ready)
+        return len(ready)
+
+    def build_posts(self, batch, executor):
+        """Посты пачки и копирование их картинок, поставленное в пул."""
+        pending = []
+        for number, row in batch:
+            try:
+                post, pub_date = self.build_post(row)
+            except RowError as exc:
+                self.stderr.write(f'Строка {number}: {exc}')
+                continue
+            image = str(row.get('image') or '')
+            copied = executor.submit(
+                copy_image, os.path.join(self.images_dir, image)
+            ) if image else None
+            pending.append((number, post, pub_date, copied))
+        return pending
+
+    def attach_images(self, pending):
+        """Дожидается картинок; строки с негодной картинкой пропускаются."""
+        ready = []
+        for number, post, pub_date, copied in pending:
+            if copied is not None:
+                try:
+                    post.image = copied.result()
+                except (OSError, ValidationError) as exc:
+                    self.stderr.write(f'Строка {number}: {exc}')
+                    continue
+            ready.append((post, pub_date))
+        return ready
+
+    def insert(self, ready):
+        posts = [post for post, _ in ready]
+        with transaction.atomic():
+            allocate_ids(posts)
+            Post.objects.bulk_create(posts)
+            # auto_now_add перезаписывает pub_date при вставке.
+            dated = []
+            for post, pub_date in ready:
+                if pub_date is not None:
+                    post.pub_date = pub_date
+                    dated.append(post)
+            Post.objects.bulk_update(dated, ['pub_date'])
+            timeline.push_posts(posts)
+            for author_id, count in Counter(
+                post.author_id for post in posts
+            ).items():
+                counters.bump(author_id, 'posts_count', count)
+            for name, count in Counter(
+                post.image.name for post in posts if post.image
+            ).items():
+                blobs.acquire(name, count)
+            search.enqueue_posts([post.id for post in posts])
+        cache.invalidate(cache.POSTS)
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_in_worker, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для уже загруженных картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS or 1,
+            help='Число потоков, строящих миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().iterator()
+        total = 0
+        if options['workers'] <= 1:
+            for name in names:
+                generate_thumbnails(name)
+                total += 1
+        else:
+            with ThreadPoolExecutor(
+                max_workers=options['workers']
+            ) as executor:
+                for _ in executor.map(generate_in_worker, names):
+                    total += 1
+        self.stdout.write(f'Обработано картинок: {total}')
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.search import get_backend, process_queue, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс постов, читая таблицу кусками, '
+        'или только разбирает очередь переиндексации (--queue).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.SEARCH_INDEX_BATCH_SIZE,
+            help='Сколько постов читать и индексировать за раз.',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Разобрать только очередь SearchQueue.',
+        )
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            total = process_queue(options['chunk_size'])
+            self.stdout.write(f'Обработано записей очереди: {total}')
+            return
+        total = rebuild(options['chunk_size'])
+        self.stdout.write(
+            f'Проиндексировано постов: {total} (индекс {get_backend()})'
+        )
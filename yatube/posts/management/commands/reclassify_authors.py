@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.timeline import reclassify_authors
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит авторов между раскладкой лент при публикации '
+        'и подмешиванием при чтении по числу подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            help='Порог подписчиков, по умолчанию '
+                 'settings.TIMELINE_FANOUT_THRESHOLD.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            promoted, demoted = reclassify_authors(options['threshold'])
+        self.stdout.write(
+            f'Подмешиваются при чтении: +{promoted}, '
+            f'возвращены к раскладке: {demoted}'
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_image_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('spec', models.CharField(max_length=50)),
+                ('name', models.CharField(max_length=255)),
+                ('width', models.PositiveIntegerField()),
+            ],
+            options={
+                'unique_together': {('source', 'spec')},
+            },
+        ),
+    ]
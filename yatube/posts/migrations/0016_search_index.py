@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:22
+
+from django.db import DatabaseError, migrations, models, transaction
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_search_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    """Создаёт таблицу FTS5, индекс строит rebuild_search_index.
+
+    Документы здесь не индексируются: миграция не должна зависеть
+    от стеммера, который со временем меняется.
+    """
+    if schema_editor.connection.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                schema_editor.execute(
+                    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body)'
+                )
+        except DatabaseError:
+            # SQLite собран без FTS5: остаётся индекс на таблицах приложения.
+            pass
+    Post = apps.get_model('posts', 'Post')
+    if Post.objects.using(schema_editor.connection.alias).exists():
+        print(
+            '\n  Поисковый индекс пуст, постройте его командой '
+            'manage.py rebuild_search_index'
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='posts.Post')),
+                ('length', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post')),
+            ],
+            options={
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -13,6 +15,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа подтягиваются одним JOIN."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -22,6 +30,10 @@ class Post(models.Model):
         'Дата создания',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -40,13 +52,35 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -72,6 +106,14 @@ class Comment(models.Model):
         help_text='Введите текст комментария'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date'],
+                name='comment_post_pub_date_idx',
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -84,3 +126,112 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись домашней ленты подписчика, раскладывается при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class CelebrityAuthor(models.Model):
+    """Автор с большим числом подписчиков: его посты не раскладываются
+    по лентам при публикации, а подмешиваются при чтении."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='celebrity',
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков на момент классификации'
+    )
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя, см. posts.counters."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField(max_length=100, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+
+class Thumbnail(models.Model):
+    """Построенная миниатюра картинки поста, см. posts.thumbnails."""
+    source = models.CharField(max_length=100)
+    spec = models.CharField(max_length=50)
+    name = models.CharField(max_length=255)
+    width = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('source', 'spec')
+
+
+class SearchDocument(models.Model):
+    """Длина проиндексированного поста в словах для BM25, см. posts.search."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+    )
+    length = models.PositiveIntegerField()
+
+
+class SearchPosting(models.Model):
+    """Вхождение основы слова в пост в обратном индексе posts.search."""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_postings',
+    )
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+
+class SearchQueue(models.Model):
+    """Пост, ждущий переиндексации фоновым потоком posts.search.
+
+    Не внешний ключ: удалённый пост тоже нужно убрать из индекса.
+    """
+    post_id = models.PositiveIntegerField()
@@ -0,0 +1,327 @@
+"""Полнотекстовый поиск по постам вместе с их комментариями.
+
+Документ — пост: его текст и тексты комментариев, приведённые к основам
+слов (posts.stemming). Индексов два, работает тот, что выбран
+settings.SEARCH_BACKEND:
+
+* 'fts5' — виртуальная таблица SQLite FTS5, в которую пишутся уже
+  приведённые к основам слова, ранжирование встроенной bm25();
+* 'python' — обратный индекс в SearchPosting/SearchDocument
+  с подсчётом BM25 на стороне приложения, работает на любой базе.
+
+В поиск попадают посты, в которых есть все слова запроса.
+
+Записи не ждут индекса: сигналы кладут id поста в SearchQueue в той же
+транзакции, а после коммита будят фоновый поток, который разбирает
+очередь пачками и затем сливает сегменты FTS5, вычищая удалённое.
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max, Sum
+
+from .models import (
+    Comment, Post, SearchDocument, SearchPosting, SearchQueue
+)
+from .stemming import tokenize
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'posts_search_fts'
+MAX_TERM_LENGTH = SearchPosting._meta.get_field('term').max_length
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Сколько страниц сегментов FTS5 сливать после пачки обновлений.
+MERGE_PAGES = 500
+
+_fts_tables = {}
+
+
+def fts5_available():
+    """Создала ли миграция 0016 таблицу FTS5 в текущей базе."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def get_backend():
+    backend = settings.SEARCH_BACKEND
+    if backend == 'auto':
+        backend = 'fts5' if fts5_available() else 'python'
+    return backend
+
+
+def document_terms(texts):
+    return [term[:MAX_TERM_LENGTH] for term in tokenize(' '.join(texts))]
+
+
+def query_terms(query):
+    """Различные основы слов запроса в порядке появления."""
+    return list(dict.fromkeys(document_terms([query])))
+
+
+def _fts5_write(documents):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(post_id,) for post_id in documents],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+            [
+                (post_id, ' '.join(terms))
+                for post_id, terms in documents.items() if terms
+            ],
+        )
+
+
+def _fts5_compact(full=False):
+    """Сливает сегменты FTS5, выбрасывая из них удалённые версии строк.
+
+    Полное сжатие ('optimize') вдобавок убирает строки удалённых постов.
+    """
+    with connection.cursor() as cursor:
+        if not full:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) '
+                f"VALUES ('merge', %s)",
+                [MERGE_PAGES],
+            )
+            return
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid NOT IN '
+            f'(SELECT id FROM {Post._meta.db_table})'
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+def _fts5_search(terms, limit):
+    match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _python_write(documents):
+    SearchPosting.objects.filter(post_id__in=documents).delete()
+    SearchDocument.objects.filter(post_id__in=documents).delete()
+    SearchDocument.objects.bulk_create(
+        SearchDocument(post_id=post_id, length=len(terms))
+        for post_id, terms in documents.items() if terms
+    )
+    SearchPosting.objects.bulk_create(
+        SearchPosting(post_id=post_id, term=term, frequency=frequency)
+        for post_id, terms in documents.items()
+        for term, frequency in Counter(terms).items()
+    )
+
+
+def _python_search(terms, limit):
+    """BM25 по обратному индексу.
+
+    Посты со всеми словами запроса отбираются в базе группировкой
+    по индексу (term, post), в память читаются вхождения только этих
+    постов, а не все вхождения слов запроса.
+    """
+    totals = SearchDocument.objects.aggregate(
+        documents=Count('pk'), length=Sum('length')
+    )
+    if not totals['documents']:
+        return []
+    average_length = totals['length'] / totals['documents']
+
+    postings = SearchPosting.objects.filter(term__in=terms)
+    found = dict(postings.values('term').annotate(
+        found=Count('pk')
+    ).values_list('term', 'found'))
+    if len(found) < len(terms):
+        return []
+    matched = postings.values('post_id').annotate(
+        matched=Count('pk')
+    ).filter(matched=len(terms)).values('post_id')
+    frequencies = defaultdict(dict)
+    for term, post_id, frequency in postings.filter(
+        post_id__in=matched
+    ).values_list('term', 'post_id', 'frequency').iterator():
+        frequencies[term][post_id] = frequency
+    candidates = list(frequencies[terms[0]])
+    lengths = dict(SearchDocument.objects.filter(
+        post_id__in=matched
+    ).values_list('post_id', 'length'))
+
+    scores = {}
+    for term, postings in frequencies.items():
+        idf = math.log(
+            (totals['documents'] - found[term] + 0.5)
+            / (found[term] + 0.5) + 1
+        )
+        for post_id in candidates:
+            frequency = postings[post_id]
+            norm = 1 - BM25_B + BM25_B * lengths[post_id] / average_length
+            scores[post_id] = scores.get(post_id, 0) + idf * (
+                frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+            )
+    ranked = sorted(scores, key=lambda post_id: (-scores[post_id], -post_id))
+    return ranked[:limit]
+
+
+def _python_compact(full=False):
+    """Строки обратного индекса удаляются сразу, сливать нечего."""
+
+
+BACKENDS = {
+    'fts5': (_fts5_write, _fts5_search, _fts5_compact),
+    'python': (_python_write, _python_search, _python_compact),
+}
+
+
+def index_posts(post_ids):
+    """Переиндексирует посты; удалённых постов в индексе не остаётся."""
+    post_ids = set(post_ids)
+    texts = defaultdict(list)
+    for post_id, text in Post.objects.filter(
+        id__in=post_ids
+    ).values_list('id', 'text'):
+        texts[post_id].append(text)
+    for post_id, text in Comment.objects.filter(
+        post_id__in=texts
+    ).values_list('post_id', 'text'):
+        texts[post_id].append(text)
+    write, _, _ = BACKENDS[get_backend()]
+    write({
+        post_id: document_terms(texts[post_id]) if post_id in texts else []
+        for post_id in post_ids
+    })
+
+
+def index_post(post_id):
+    index_posts([post_id])
+
+
+def find_posts(query, limit=None):
+    """id постов по убыванию релевантности запросу."""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    _, search, _ = BACKENDS[get_backend()]
+    return search(terms, limit or settings.SEARCH_MAX_RESULTS)
+
+
+def compact(full=False):
+    _, _, compact_backend = BACKENDS[get_backend()]
+    compact_backend(full)
+
+
+def process_queue(batch_size=None):
+    """Разбирает очередь пачками, возвращает число обработанных записей.
+
+    Из очереди удаляются только прочитанные строки: пост, снова
+    поставленный в очередь во время индексации, останется в ней.
+    """
+    batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+    processed = 0
+    while True:
+        with transaction.atomic():
+            entries = list(SearchQueue.objects.order_by('id').values_list(
+                'id', 'post_id'
+            )[:batch_size])
+            if not entries:
+                break
+            index_posts(post_id for _, post_id in entries)
+            SearchQueue.objects.filter(
+                id__in=[entry_id for entry_id, _ in entries]
+            ).delete()
+        processed += len(entries)
+    if processed:
+        compact()
+    return processed
+
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run_worker():
+    while True:
+        _wakeup.wait()
+        # Даём накопиться пачке записей, пришедших следом.
+        time.sleep(settings.SEARCH_INDEX_DELAY)
+        _wakeup.clear()
+        try:
+            process_queue()
+        except Exception:
+            logger.exception('Не удалось обновить поисковый индекс')
+        finally:
+            connections.close_all()
+
+
+def wake_worker():
+    """Будит фоновый поток индексации, запуская его при первом вызове."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_run_worker, name='search-index', daemon=True
+            )
+            _worker.start()
+    _wakeup.set()
+
+
+def enqueue(post_id):
+    """Ставит пост в очередь переиндексации вместе с текущей записью."""
+    enqueue_posts([post_id])
+
+
+def enqueue_posts(post_ids):
+    """enqueue для пачки постов одной вставкой в очередь."""
+    if not settings.SEARCH_INDEX_WRITE_BEHIND:
+        index_posts(post_ids)
+        return
+    SearchQueue.objects.bulk_create(
+        SearchQueue(post_id=post_id) for post_id in post_ids
+    )
+    transaction.on_commit(wake_worker)
+
+
+def rebuild(chunk_size=None):
+    """Переиндексирует все посты кусками по id с ограниченной памятью.
+
+    Возвращает число постов. Очередь, накопленная до начала, покрыта
+    перестройкой и очищается; удалённые посты вычищаются в конце.
+    """
+    chunk_size = chunk_size or settings.SEARCH_INDEX_BATCH_SIZE
+    queued = SearchQueue.objects.aggregate(last=Max('id'))['last']
+    total = 0
+    last_id = 0
+    while True:
+        post_ids = list(Post.objects.filter(id__gt=last_id).order_by(
+            'id'
+        ).values_list('id', flat=True)[:chunk_size])
+        if not post_ids:
+            break
+        with transaction.atomic():
+            index_posts(post_ids)
+        total += len(post_ids)
+        last_id = post_ids[-1]
+    if queued is not None:
+        SearchQueue.objects.filter(id__lte=queued).delete()
+    compact(full=True)
+    return total
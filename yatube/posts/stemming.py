@@ -0,0 +1,171 @@
+"""Токенизация и стемминг текста постов для поиска.
+
+Для русского — алгоритм Snowball (Портера для русского языка),
+для английского — облегчённое отсечение частых окончаний.
+"""
+import re
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+CYRILLIC_RE = re.compile('[а-я]')
+
+RU_VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('вшись', 'вши', 'в'),
+    ('ывшись', 'ившись', 'ывши', 'ивши', 'ыв', 'ив'),
+)
+REFLEXIVE = ('ся', 'сь')
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое',
+    'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = (
+    (
+        'ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н',
+    ),
+    (
+        'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило',
+        'ыло', 'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй',
+        'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+    'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах',
+    'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы',
+    'ь', 'ю', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+EN_SUFFIXES = ('ingly', 'edly', 'ness', 'ment', 'ing', 'ful', 'ed', 'ly')
+
+
+def _longest(word, endings):
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending):
+            return ending
+    return None
+
+
+def _strip_grouped(word, groups):
+    """Снимает окончание; окончания первой группы идут после а/я."""
+    preceded, plain = groups
+    candidates = [
+        (ending, True) for ending in preceded
+        if word.endswith(ending) and word[:-len(ending)][-1:] in ('а', 'я')
+    ] + [(ending, False) for ending in plain if word.endswith(ending)]
+    if not candidates:
+        return None
+    ending, _ = max(candidates, key=lambda candidate: len(candidate[0]))
+    return word[:-len(ending)]
+
+
+def _regions(word):
+    """Начала областей RV и R2 по правилам Snowball."""
+    rv = next(
+        (i + 1 for i, char in enumerate(word) if char in RU_VOWELS),
+        len(word),
+    )
+
+    def after_consonant_vowel(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_consonant_vowel(0)
+    return rv, after_consonant_vowel(r1)
+
+
+def _strip_adjectival(tail):
+    """Окончание прилагательного и причастие перед ним, None без них."""
+    ending = _longest(tail, ADJECTIVE)
+    if not ending:
+        return None
+    tail = tail[:-len(ending)]
+    stripped = _strip_grouped(tail, PARTICIPLE)
+    return tail if stripped is None else stripped
+
+
+def _strip_step1(tail):
+    """Шаг 1: деепричастие, иначе возвратная частица и затем
+    прилагательное, глагол или существительное."""
+    stripped = _strip_grouped(tail, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    ending = _longest(tail, REFLEXIVE)
+    if ending:
+        tail = tail[:-len(ending)]
+    stripped = _strip_adjectival(tail)
+    if stripped is None:
+        stripped = _strip_grouped(tail, VERB)
+    if stripped is not None:
+        return stripped
+    ending = _longest(tail, NOUN)
+    return tail[:-len(ending)] if ending else tail
+
+
+def stem_russian(word):
+    rv, r2 = _regions(word)
+    prefix, tail = word[:rv], word[rv:]
+    tail = _strip_step1(tail)
+
+    if tail.endswith('и'):
+        tail = tail[:-1]
+
+    ending = _longest(tail, DERIVATIONAL)
+    if ending and rv + len(tail) - len(ending) >= r2:
+        tail = tail[:-len(ending)]
+
+    if tail.endswith('нн'):
+        tail = tail[:-1]
+    else:
+        ending = _longest(tail, SUPERLATIVE)
+        if ending:
+            tail = tail[:-len(ending)]
+            if tail.endswith('нн'):
+                tail = tail[:-1]
+        elif tail.endswith('ь'):
+            tail = tail[:-1]
+    return prefix + tail
+
+
+def stem_english(word):
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in EN_SUFFIXES:
+        stem = word[:-len(suffix)]
+        if (
+            word.endswith(suffix)
+            and len(stem) >= 3
+            and any(char in 'aeiouy' for char in stem)
+        ):
+            if stem[-1] == stem[-2] and stem[-1] not in 'lsz':
+                stem = stem[:-1]
+            return stem
+    return word
+
+
+def stem(word):
+    if CYRILLIC_RE.search(word):
+        return stem_russian(word)
+    if word.isascii() and word.isalpha():
+        return stem_english(word)
+    return word
+
+
+def tokenize(text):
+    """Основы слов текста в порядке появления."""
+    text = text.lower().replace('ё', 'е')
+    return [stem(token) for token in TOKEN_RE.findall(text)]
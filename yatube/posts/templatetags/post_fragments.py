@@ -0,0 +1,78 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..thumbnails import prefetch_variants
+from ..utils import CURSOR_NEXT, encode_cursor
+
+register = template.Library()
+
+ARTICLE_TEMPLATE = 'posts/includes/article_block.html'
+
+
+def fragment_key(post, not_profile_page, is_group_page):
+    """Ключ отрисованного поста.
+
+    Кроме id и времени изменения учитывает всё, что выводит
+    article_block.html из автора и группы: эти объекты уже выбраны
+    через feed(), поэтому ключ считается без запросов к базе.
+    """
+    group_slug = post.group.slug if post.group_id else ''
+    signature = ':'.join((
+        str(post.id),
+        post.updated.isoformat(),
+        post.author.get_username(),
+        post.author.get_full_name(),
+        group_slug,
+        str(int(bool(not_profile_page))),
+        str(int(bool(is_group_page))),
+    ))
+    return 'post_fragment:' + hashlib.md5(signature.encode()).hexdigest()
+
+
+@register.simple_tag
+def post_fragments(posts, not_profile_page=True, is_group_page=False):
+    """Отрисованные посты страницы из кэша фрагментов.
+
+    Все фрагменты страницы читаются одним get_many, отрисовываются
+    только промахи, а их миниатюры загружаются одним запросом.
+    """
+    posts = list(posts)
+    keys = [
+        fragment_key(post, not_profile_page, is_group_page)
+        for post in posts
+    ]
+    fragments = cache.get_many(keys)
+    missing = [
+        post for post, key in zip(posts, keys) if key not in fragments
+    ]
+    prefetch_variants(post.image.name for post in missing if post.image)
+    rendered = {}
+    for post, key in zip(posts, keys):
+        if key not in fragments:
+            rendered[key] = render_to_string(ARTICLE_TEMPLATE, {
+                'post': post,
+                'not_profile_page': not_profile_page,
+                'is_group_page': is_group_page,
+            })
+    if rendered:
+        cache.set_many(rendered, settings.FEED_CACHE_TIMEOUT)
+        fragments.update(rendered)
+    return [mark_safe(fragments[key]) for key in keys]
+
+
+@register.simple_tag
+def next_cursor(page_obj):
+    """Курсор продолжения ленты после страницы, None — лента кончилась.
+
+    Номерная страница тоже продолжается курсором от последнего поста:
+    догрузка при прокрутке всегда идёт по ключу, без OFFSET.
+    """
+    if not page_obj.has_next():
+        return None
+    cursor = getattr(page_obj, 'next_cursor', None)
+    return cursor or encode_cursor(page_obj.object_list[-1], CURSOR_NEXT)
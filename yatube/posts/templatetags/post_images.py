@@ -0,0 +1,46 @@
+import logging
+
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..thumbnails import FALLBACK_FORMAT, MODERN_FORMATS, responsive_variants
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 992px) 100vw, 960px'
+
+
+def _srcset(variants):
+    return format_html_join(', ', '{} {}w', variants)
+
+
+@register.simple_tag
+def responsive_image(image, sizes=DEFAULT_SIZES):
+    """<picture> с вариантами картинки по ширине и формату.
+
+    Браузер сам выбирает ширину по sizes и первый понятный ему формат,
+    JPEG остаётся запасным вариантом в <img>.
+    """
+    if not image:
+        return ''
+    try:
+        variants = responsive_variants(image.name)
+    except Exception:
+        logger.exception('Не удалось получить миниатюры для %s', image)
+        return ''
+    sources = format_html_join(
+        '\n', '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (image_format.lower(), _srcset(variants[image_format]), sizes)
+            for image_format in MODERN_FORMATS
+        ),
+    )
+    fallback = variants[FALLBACK_FORMAT]
+    src = fallback[-1][0]
+    return format_html(
+        '<picture>\n{}\n<img class="card-img my-2" src="{}" srcset="{}" '
+        'sizes="{}" loading="lazy" alt="">\n</picture>',
+        sources, src, _srcset(fallback), sizes,
+    )
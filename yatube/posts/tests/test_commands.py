@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .utils import SMALL_GIF
+from ..models import (
+    Comment, Follow, Group, ImageBlob, Post, TimelineEntry, UserStats
+)
+from ..search import find_posts
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(title='title', slug='slug')
+        cls.author = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        Follow.objects.create(author=cls.author, user=cls.follower)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @override_settings(SEARCH_INDEX_WRITE_BEHIND=False)
+    def test_import_posts(self):
+        """Импорт пачками: ленты, счётчики, картинки и поиск обновляются,
+        повторный запуск с контрольной точкой ничего не дублирует."""
+        directory = tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        with open(os.path.join(directory, 'small.gif'), 'wb') as image:
+            image.write(SMALL_GIF)
+        with open(os.path.join(directory, 'fake.gif'), 'wb') as image:
+            image.write(b'not an image')
+        rows = [
+            {'text': 'Импорт первый', 'author': 'auth', 'group': 'slug',
+             'pub_date': '2020-01-02T03:04:05', 'image': 'small.gif'},
+            {'text': '', 'author': 'auth'},
+            {'text': 'Импорт второй', 'author': 'auth', 'image': 'small.gif'},
+            {'text': 'Импорт третий', 'author': 'newcomer'},
+            {'text': 'Импорт поддельный', 'author': 'auth',
+             'image': 'fake.gif'},
+        ]
+        path = os.path.join(directory, 'posts.jsonl')
+        with open(path, 'w') as stream:
+            stream.write('\n'.join(json.dumps(row) for row in rows))
+        options = {
+            'batch_size': 2,
+            'create_authors': True,
+            'checkpoint': os.path.join(directory, 'checkpoint.json'),
+            'stdout': StringIO(),
+            'stderr': StringIO(),
+        }
+
+        call_command('import_posts', path, **options)
+        call_command('import_posts', path, **options)
+
+        imported = Post.objects.filter(text__startswith='Импорт')
+        self.assertEqual(imported.count(), 3)
+        self.assertIn('Строка 5:', options['stderr'].getvalue())
+        first = imported.get(text='Импорт первый')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).refcount, 2
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+        self.assertEqual(
+            UserStats.objects.get(user__username='newcomer').posts_count, 1
+        )
+        self.assertEqual(len(find_posts('импорт')), 3)
+
+
+class ExportPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.post = Post.objects.create(text='Test post', author=cls.author)
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(self.author)
+
+    def test_export_posts(self):
+        """Выгрузка отдаётся потоком только персоналу и фильтруется по дате."""
+        Comment.objects.create(
+            post=self.post, author=self.follower, text='Комментарий'
+        )
+        url = reverse('posts:export', args=('posts',))
+        self.assertEqual(self.auth_client.get(url).status_code, 302)
+
+        self.author.is_staff = True
+        self.author.save()
+        response = self.auth_client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'text'])
+        self.assertEqual(
+            lines[1].split(',')[:2], [str(self.post.id), 'Test post']
+        )
+
+        response = self.auth_client.get(url, {'since': '2999-01-01'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        response = self.auth_client.get(url, {'since': 'вчера'})
+        self.assertEqual(response.status_code, 400)
+
+        output = StringIO()
+        call_command(
+            'export_posts', kind='comments', export_format='columns',
+            chunk_size=1, stdout=output,
+        )
+        chunk = json.loads(output.getvalue())
+        self.assertEqual(chunk['rows'], 1)
+        self.assertEqual(chunk['columns']['text'], ['Комментарий'])
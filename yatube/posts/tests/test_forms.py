@@ -1,11 +1,21 @@
 from django.contrib.auth import get_user_model
 from ..forms import PostForm
-from ..models import Group, Post, Comment
+from ..models import Comment, Group, ImageBlob, Post, Thumbnail
+from ..thumbnails import THUMBNAIL_SPECS
+from .utils import SMALL_GIF
+import os
 import shutil
+import struct
 import tempfile
+import zlib
+from io import BytesIO, StringIO
+from unittest import mock
 from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 
 User = get_user_model()
@@ -55,7 +65,8 @@ class FormsTest(TestCase):
             Post.objects.filter(
                 text='123',
                 id=1,
-                image='posts/small.gif'
+                image__startswith='posts/',
+                image__endswith='.gif',
             ).exists()
         )
 
@@ -113,3 +124,160 @@ class FormsTest(TestCase):
         self.assertEqual(
             Comment.objects.filter(post_id=self.post.id).count(),
             comments_count + 1)
+
+    def test_pregenerate_thumbnails(self):
+        """Команда строит миниатюры для загруженных картинок."""
+        Post.objects.create(
+            author=self.auth_user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'thumb.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        call_command(
+            'pregenerate_thumbnails', workers=1, stdout=StringIO()
+        )
+        self.assertEqual(
+            Thumbnail.objects.count(), len(THUMBNAIL_SPECS)
+        )
+        for thumbnail in Thumbnail.objects.all():
+            with self.subTest(spec=thumbnail.spec):
+                self.assertTrue(os.path.exists(
+                    os.path.join(TEMP_MEDIA_ROOT, thumbnail.name)
+                ))
+
+    @mock.patch(
+        'posts.thumbnails.transaction.on_commit', lambda callback: callback()
+    )
+    def test_thumbnails_built_after_commit(self):
+        """Миниатюры строит пул после коммита, а не поток запроса;
+        с THUMBNAIL_WORKERS = 0 — сразу после коммита."""
+        url = reverse('posts:post_create')
+        with override_settings(THUMBNAIL_WORKERS=2), mock.patch(
+            'posts.thumbnails.get_executor'
+        ) as get_executor:
+            self.auth_client.post(url, {
+                'text': 'В пуле',
+                'image': SimpleUploadedFile(
+                    'pool.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            })
+        get_executor.return_value.submit.assert_called_once()
+        self.assertFalse(Thumbnail.objects.exists())
+
+        with override_settings(THUMBNAIL_WORKERS=0):
+            self.auth_client.post(url, {
+                'text': 'Сразу',
+                'image': SimpleUploadedFile(
+                    'inline.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            })
+        self.assertEqual(Thumbnail.objects.count(), len(THUMBNAIL_SPECS))
+
+    def upload_image(self, size, image_format='JPEG', **save_options):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(
+            buffer, format=image_format, **save_options
+        )
+        return SimpleUploadedFile(
+            f'image.{image_format.lower()}',
+            buffer.getvalue(),
+            content_type=f'image/{image_format.lower()}',
+        )
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_image_too_big_rejected(self):
+        """Слишком большой файл отклоняется до разбора картинки."""
+        form = PostForm(
+            data={'text': 'текст'},
+            files={'image': self.upload_image((50, 50))},
+        )
+        with mock.patch('PIL.Image.open') as pillow_open:
+            self.assertFalse(form.is_valid())
+        pillow_open.assert_not_called()
+        self.assertEqual(form.errors.as_data()['image'][0].code, 'too_big')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_image_too_many_pixels_rejected(self):
+        """Картинка с большим числом пикселей отклоняется по заголовку."""
+        form = PostForm(
+            data={'text': 'текст'},
+            files={'image': self.upload_image((20, 20))},
+        )
+        with mock.patch('PIL.Image.Image.verify') as verify:
+            self.assertFalse(form.is_valid())
+        verify.assert_not_called()
+        self.assertEqual(
+            form.errors.as_data()['image'][0].code, 'too_many_pixels'
+        )
+
+    def test_not_an_image_rejected(self):
+        """Не картинка и заголовок с огромными размерами — ошибка формы."""
+        def chunk(kind, data):
+            return (
+                struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data))
+            )
+
+        huge_png = b'\x89PNG\r\n\x1a\n' + chunk(
+            b'IHDR', struct.pack('>IIBBBBB', 60000, 60000, 8, 2, 0, 0, 0)
+        ) + chunk(b'IDAT', b'')
+        for name, content in (
+            ('a.jpg', b'not an image'), ('huge.png', huge_png)
+        ):
+            with self.subTest(name=name):
+                form = PostForm(
+                    data={'text': 'текст'},
+                    files={'image': SimpleUploadedFile(name, content)},
+                )
+                self.assertFalse(form.is_valid())
+                self.assertEqual(
+                    form.errors.as_data()['image'][0].code, 'invalid_image'
+                )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_image_shrunk_and_exif_stripped(self):
+        """Большой оригинал уменьшается, EXIF вырезается."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        form = PostForm(
+            data={'text': 'текст'},
+            files={'image': self.upload_image(
+                (400, 200), exif=exif.tobytes()
+            )},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (100, 50))
+        self.assertNotIn('exif', image.info)
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом до последней ссылки."""
+        posts = [
+            Post.objects.create(
+                author=self.auth_user,
+                text=f'пост {i}',
+                image=SimpleUploadedFile(
+                    f'copy_{i}.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+            for i in range(2)
+        ]
+        name = posts[0].image.name
+        self.assertEqual(posts[1].image.name, name)
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 2)
+        storage = posts[0].image.storage
+
+        with mock.patch(
+            'posts.blobs.transaction.on_commit', lambda callback: callback()
+        ):
+            posts[0].delete()
+            self.assertTrue(storage.exists(name))
+            posts[1].image = SimpleUploadedFile(
+                'other.gif', SMALL_GIF + b'\x00', content_type='image/gif'
+            )
+            posts[1].save()
+
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertFalse(storage.exists(name))
+        self.assertTrue(storage.exists(posts[1].image.name))
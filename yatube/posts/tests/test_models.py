@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import CelebrityAuthor, Comment, Follow, Group, Post
+from ..timeline import get_timeline
+from ..utils import FeedPart
 
 User = get_user_model()
 
@@ -30,3 +33,99 @@ class PostModelTest(TestCase):
         group = self.group
         expected_group_str = group.title
         self.assertEqual(expected_group_str, str(group))
+
+
+class QueryPlanTest(TestCase):
+    """Проверяем, что ленты читаются по составным индексам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Текст'
+        )
+
+    def assertUsesIndex(self, queryset, *index_names):
+        if connection.vendor != 'sqlite':
+            self.skipTest('План запроса проверяется только для SQLite')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f'{index_names} не используется: {plan}'
+        )
+        self.assertNotIn('TEMP B-TREE', plan)
+        return plan
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты автора, группы и главная сортируются по индексу."""
+        cases = {
+            'post_author_pub_date_idx': self.user.posts.all(),
+            'post_group_pub_date_idx': self.group.posts.all(),
+            'post_pub_date_id_idx': Post.objects.order_by(
+                '-pub_date', '-id'
+            )[:11],
+        }
+        for index_name, queryset in cases.items():
+            with self.subTest(index=index_name):
+                self.assertUsesIndex(queryset, index_name)
+
+    def test_cursor_pages_seek_by_index(self):
+        """Страница по курсору начинается с позиции в индексе,
+        в главной ленте и в ленте группы."""
+        position = (self.post.pub_date, self.post.id)
+        cases = (
+            (Post.objects.feed(), 'post_pub_date_id_idx'),
+            (self.group.posts.feed(), 'post_group_pub_date_idx'),
+        )
+        for queryset, index_name in cases:
+            part = FeedPart(queryset)
+            self.assertUsesIndex(part.newest()[:11], index_name)
+            for page in (
+                part.rows_after(*position)[:11],
+                part.rows_before(*position)[:11],
+            ):
+                with self.subTest(query=str(page.query)):
+                    plan = self.assertUsesIndex(page, index_name)
+                    self.assertIn('SEARCH posts_post USING INDEX', plan)
+
+    def test_timeline_reads_by_index(self):
+        """Домашняя лента и посты знаменитостей читаются диапазоном."""
+        CelebrityAuthor.objects.create(author=self.user, followers_count=1)
+        Follow.objects.create(user=self.user, author=self.user)
+        entries, celebrity = get_timeline(self.user).parts
+        position = (self.post.pub_date, self.post.id)
+        cases = (
+            (entries, 'timeline_user_pub_date_idx'),
+            (celebrity, 'post_author_pub_date_idx'),
+        )
+        for part, index_name in cases:
+            for queryset in (
+                part.newest()[20:31],
+                part.rows_after(*position)[:11],
+                part.rows_before(*position)[:11],
+            ):
+                with self.subTest(query=str(queryset.query)):
+                    self.assertUsesIndex(queryset, index_name)
+
+    def test_follow_and_comment_queries_use_indexes(self):
+        """Проверка подписки и комментарии поста идут по индексу."""
+        self.assertUsesIndex(
+            Follow.objects.filter(user=self.user, author=self.user),
+            'unique_follow',
+            # SQLite создаёт уникальное ограничение вместе с таблицей.
+            'sqlite_autoindex_posts_follow',
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post).order_by('pub_date'),
+            'comment_post_pub_date_idx',
+        )
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора невозможна."""
+        Follow.objects.create(user=self.user, author=self.user)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=self.user)
@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, SearchQueue
+from ..search import FTS_TABLE, find_posts, process_queue
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(self.author)
+
+    @override_settings(SEARCH_INDEX_WRITE_BEHIND=False)
+    def test_search(self):
+        """Поиск находит посты по основам слов текста и комментариев."""
+        for backend in ('fts5', 'python'):
+            with self.subTest(backend=backend), override_settings(
+                SEARCH_BACKEND=backend
+            ):
+                Post.objects.all().delete()
+                cats = Post.objects.create(
+                    author=self.author, text='Кошки гуляли по крышам'
+                )
+                cat = Post.objects.create(
+                    author=self.author,
+                    text='Кошка, кошка и ещё раз кошка',
+                )
+                dog = Post.objects.create(
+                    author=self.author, text='Running dogs'
+                )
+                Comment.objects.create(
+                    post=dog, author=self.follower, text='Хорошая кошка'
+                )
+                response = self.client.get(
+                    reverse('posts:search'), {'q': 'КОШКОЙ'}
+                )
+                self.assertEqual(
+                    [post.id for post in response.context['page_obj']],
+                    [cat.id, dog.id, cats.id],
+                )
+                self.assertEqual(
+                    find_posts('dog run'), [dog.id]
+                )
+                cat.delete()
+                self.assertEqual(find_posts('кошка'), [dog.id, cats.id])
+
+                self.author.is_staff = self.author.is_superuser = True
+                self.author.save()
+                with override_settings(SEARCH_MAX_RESULTS=1):
+                    response = self.auth_client.get(
+                        reverse('admin:posts_post_changelist'),
+                        {'q': 'кошка'},
+                    )
+                self.assertEqual(
+                    [post.id for post in response.context['cl'].result_list],
+                    [dog.id],
+                )
+                self.assertEqual(
+                    len(response.context['messages']), 1
+                )
+
+    @override_settings(SEARCH_INDEX_WRITE_BEHIND=True)
+    def test_search_write_behind_queue(self):
+        """Записи копятся в очереди и индексируются одной пачкой."""
+        post = Post.objects.create(author=self.author, text='Очередь')
+        Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий'
+        )
+        self.assertEqual(find_posts('очередь'), [])
+        self.assertEqual(
+            list(SearchQueue.objects.values_list('post_id', flat=True)),
+            [post.id, post.id],
+        )
+
+        self.assertEqual(process_queue(), 2)
+        self.assertEqual(find_posts('очередь комментарий'), [post.id])
+        self.assertFalse(SearchQueue.objects.exists())
+
+    def test_rebuild_search_index(self):
+        """Команда перестраивает индекс кусками и убирает удалённые посты."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Перестройка {i}')
+            for i in range(5)
+        ]
+        with override_settings(SEARCH_INDEX_WRITE_BEHIND=True):
+            posts.pop().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+        call_command(
+            'rebuild_search_index', chunk_size=2, stdout=StringIO()
+        )
+        self.assertEqual(
+            find_posts('перестройка'),
+            [post.id for post in reversed(posts)],
+        )
+        self.assertFalse(SearchQueue.objects.exists())
@@ -1,14 +1,32 @@
+import base64
+import os
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django import forms
 from django.core.cache import cache
-from django.test import Client, TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from .utils import create_post_with_photo
-from ..models import Group, Post, Follow
+from .utils import SMALL_GIF, create_post_with_photo
+from .. import thumbnails
+from ..models import (
+    Comment, Follow, Group, Post, Thumbnail, TimelineEntry, UserStats
+)
+from ..utils import encode_cursor
+from ..thumbnails import (
+    THUMBNAIL_SPECS, build_variants, prefetch_variants, responsive_variants
+)
 
 User = get_user_model()
 
@@ -219,6 +237,45 @@ class ViewsTest(TestCase):
                     self.POSTS_ON_PAGE_2
                 )
 
+    def test_cursor_paginator(self):
+        """Тестирование курсорной пагинации вперёд и назад."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'тестовый пост {i}')
+            for i in range(14)
+        )
+        url = reverse('posts:index')
+
+        first_page = self.client.get(url + '?cursor=').context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        self.assertIsNotNone(first_page.next_cursor)
+
+        second_page = self.client.get(
+            url + f'?cursor={first_page.next_cursor}').context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            set(first_page) & set(second_page), set()
+        )
+
+        back_page = self.client.get(
+            url + f'?cursor={second_page.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+        broken_page = self.client.get(url + '?cursor=broken')
+        self.assertEqual(
+            list(broken_page.context['page_obj']), list(first_page)
+        )
+
+        huge_id = base64.urlsafe_b64encode(
+            b'n|2020-01-01T00:00:00+00:00|99999999999999999999999'
+        ).decode()
+        huge_page = self.client.get(url, {'cursor': huge_id})
+        self.assertEqual(
+            list(huge_page.context['page_obj']), list(first_page)
+        )
+
     def post_test(self, post):
         """Вспомогательная функция тестирования постов."""
         self.assertEqual(post.text, self.post.text)
@@ -227,23 +284,39 @@ class ViewsTest(TestCase):
 
     def test_cache_index(self):
         """Проверка хранения и очищения кэша для index."""
-        response_before_add = self.auth_client.get(reverse('posts:index'))
-        Post.objects.create(
-            text='test_new_post',
-            author=self.author,
-        )
-        response_after_add = self.auth_client.get(reverse('posts:index'))
+        response_before_change = self.auth_client.get(reverse('posts:index'))
+        Post.objects.filter(id=self.post.id).update(text='changed in db')
+        response_after_change = self.auth_client.get(reverse('posts:index'))
         self.assertEqual(
-            response_after_add.content,
-            response_before_add.content
+            response_after_change.content,
+            response_before_change.content
         )
         cache.clear()
         response_after_clean = self.auth_client.get(reverse('posts:index'))
         self.assertNotEqual(
-            response_after_add.content,
+            response_after_change.content,
             response_after_clean.content
         )
 
+    def test_cache_invalidated_on_save(self):
+        """Проверка сброса кэша index и follow при изменениях."""
+        pages = {
+            reverse('posts:index'): lambda: Post.objects.create(
+                text='test_new_post', author=self.not_follower
+            ),
+            reverse('posts:follow_index'): lambda: Follow.objects.create(
+                user=self.follower, author=self.not_follower
+            ),
+        }
+        for page, change in pages.items():
+            with self.subTest(page=page):
+                response_before = self.follower_client.get(page)
+                change()
+                response_after = self.follower_client.get(page)
+                self.assertNotEqual(
+                    response_before.content, response_after.content
+                )
+
     def test_new_post_on_follow_page(self):
         """Проверка появления нового поста в ленте у подписчика."""
         response = self.follower_client.get(reverse('posts:follow_index'))
@@ -271,3 +344,386 @@ class ViewsTest(TestCase):
         follows_count_after = Follow.objects.filter(
             user_id=self.follower.id).count()
         self.assertEqual(follows_count_before + 1, follows_count_after)
+
+    def test_timeline_follow_and_unfollow(self):
+        """Тестирование наполнения и очистки ленты подписок."""
+        TimelineEntry.objects.all().delete()
+        Follow.objects.filter(user=self.follower).delete()
+        self.follower_client.get(reverse(
+            'posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=self.post).exists())
+
+        new_post = Post.objects.create(text='new', author=self.author)
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, self.post]
+        )
+
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+
+    def test_celebrity_posts_merged_on_read(self):
+        """Тестирование подмешивания постов популярных авторов."""
+        call_command('reclassify_authors', threshold=1, stdout=StringIO())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+        Follow.objects.create(user=self.follower, author=self.not_follower)
+        fanned_out = Post.objects.create(
+            text='fanned out', author=self.not_follower
+        )
+        new_post = Post.objects.create(text='new', author=self.author)
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post', flat=True)),
+            [fanned_out.id],
+        )
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [new_post, fanned_out, self.post],
+        )
+        response = self.follower_client.get(
+            reverse('posts:follow_index'),
+            {'cursor': encode_cursor(fanned_out)},
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+        call_command('reclassify_authors', threshold=100, stdout=StringIO())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 3
+        )
+
+    def test_counters_follow_views(self):
+        """Тестирование денормализованных счётчиков."""
+        self.not_follower_client.get(reverse(
+            'posts:profile_follow', args=(self.author.username,))
+        )
+        self.not_follower_client.post(
+            reverse('posts:add_comment', args=(self.post.id,)),
+            data={'text': 'comment'},
+        )
+        self.author.stats.refresh_from_db()
+        self.not_follower.stats.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 2)
+        self.assertEqual(self.not_follower.stats.following_count, 1)
+        self.assertEqual(self.not_follower.stats.comments_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+        self.not_follower_client.get(reverse(
+            'posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.post.delete()
+        self.author.stats.refresh_from_db()
+        self.not_follower.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 0)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.not_follower.stats.following_count, 0)
+        self.assertEqual(self.not_follower.stats.comments_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Тестирование команды recount."""
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(id=self.post.id).update(comments_count=3)
+        UserStats.objects.filter(user=self.follower).delete()
+
+        call_command('recount', stdout=StringIO())
+
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.follower).following_count, 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        ]
+
+        def count_queries(page):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.follower_client.get(page)
+            return len(queries)
+
+        # Ленты длиннее страницы с самого начала: короткой ленте не нужен
+        # COUNT(*), число постов видно по самой выборке.
+        for i in range(10):
+            Post.objects.create(text='text', author=self.author,
+                                group=self.group)
+        budget = {page: count_queries(page) for page in pages}
+        for i in range(9):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=self.follower, author=author)
+            Post.objects.create(text='text', author=author, group=self.group)
+            Post.objects.create(text='text', author=self.author)
+            Comment.objects.create(post=self.post, author=author, text='c')
+
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertEqual(count_queries(page), budget[page])
+
+    def test_post_fragments_cache(self):
+        """Фрагменты постов кэшируются по посту, а не по странице."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'пост {i}') for i in range(10)
+        )
+        url = reverse('posts:index')
+        first_page = self.client.get(url).content.decode()
+        second_page = self.client.get(url + '?page=2').content.decode()
+        self.assertIn('Test post', second_page)
+        self.assertNotIn('Test post', first_page)
+        self.assertNotIn(reverse('posts:follow_index'), first_page)
+
+        self.auth_client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            data={'text': 'edited post'},
+        )
+        response = self.client.get(url + '?page=2')
+        self.assertContains(response, 'edited post')
+        profile = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+            + '?page=2'
+        )
+        self.assertContains(profile, 'edited post')
+        self.assertNotContains(profile, 'Автор:')
+
+    @mock.patch(
+        'posts.cache.transaction.on_commit', lambda callback: callback()
+    )
+    def test_conditional_get(self):
+        """Повторный запрос с ETag получает 304, изменения сбрасывают его."""
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.client.get(page)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage', response['Cache-Control'])
+                etag = response['ETag']
+                cached = self.client.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(cached.status_code, 304)
+
+                Comment.objects.create(
+                    post=self.post, author=self.author, text='new'
+                )
+                Post.objects.create(text='new', author=self.author)
+                changed = self.client.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(changed.status_code, 200)
+
+    @mock.patch(
+        'posts.cache.transaction.on_commit', lambda callback: callback()
+    )
+    def test_conditional_get_per_user(self):
+        """ETag ленты подписок зависит от пользователя и его подписок."""
+        url = reverse('posts:follow_index')
+        response = self.follower_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(
+            self.follower_client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304
+        )
+        self.assertEqual(
+            self.not_follower_client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
+        Follow.objects.create(user=self.follower, author=self.not_follower)
+        self.assertEqual(
+            self.follower_client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
+
+    def test_pages_invalidated_after_commit(self):
+        """Поколение меняется только после коммита записи."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        # TestCase не коммитит: запись видна, но поколение ещё старое.
+        Post.objects.create(text='new', author=self.author)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_responsive_image_variants(self):
+        """Картинка поста отдаётся в нескольких ширинах и форматах."""
+        create_post_with_photo(self)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(Post.objects.first().id,))
+        )
+        self.assertContains(response, '<source type="image/webp"')
+        for width in (480, 768, 960):
+            with self.subTest(width=width):
+                self.assertContains(response, f'.webp {width}w')
+                self.assertContains(response, f'.jpg {width}w')
+
+    def test_thumbnails_resolved_in_one_query(self):
+        """Миниатюры всех постов страницы читаются одним запросом."""
+        sources = []
+        for i in range(3):
+            post = Post.objects.create(
+                author=self.author,
+                text=f'пост {i}',
+                image=SimpleUploadedFile(
+                    f'{i}.gif', SMALL_GIF + bytes([i]),
+                    content_type='image/gif'
+                ),
+            )
+            build_variants(post.image.name)
+            sources.append(post.image.name)
+        self.assertEqual(Thumbnail.objects.filter(
+            source__in=sources).count(), 3 * len(THUMBNAIL_SPECS))
+        thumbnails._variants.clear()
+
+        with self.assertNumQueries(1):
+            prefetch_variants(sources)
+        with self.assertNumQueries(0):
+            for source in sources:
+                variants = responsive_variants(source)
+                self.assertEqual(len(variants['JPEG']), 3)
+
+    def test_windowed_pagination(self):
+        """Навигация показывает окно страниц, число постов кэшируется."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'пост {i}') for i in range(95)
+        )
+        cache.clear()
+        response = self.client.get(reverse('posts:index'), {'page': 5})
+        self.assertEqual(
+            response.context['page_obj'].page_window,
+            [1, None, 3, 4, 5, 6, 7, None, 10],
+        )
+        self.assertNotContains(response, '?page=8"')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'), {'page': 6})
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+
+    def test_estimated_count_corrected(self):
+        """Завышенная оценка числа постов не ломает последнюю страницу."""
+        UserStats.objects.filter(user=self.author).update(posts_count=1000)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,)),
+            {'page': 50},
+        )
+        page = response.context['page_obj']
+        self.assertEqual(page.number, 1)
+        self.assertEqual(page.paginator.count, 1)
+        self.assertEqual(list(page), [self.post])
+
+    def test_feed_fragments(self):
+        """Догрузка ленты отдаёт только посты следующей пачки."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'пост {i}', group=self.group)
+            for i in range(14)
+        )
+        response = self.client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].object_list[-1]
+        token = encode_cursor(cursor)
+        self.assertContains(response, f'data-cursor="{token}"')
+
+        response = self.client.get(
+            reverse('posts:index_fragments'), {'cursor': token}
+        )
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(response.content.decode().count('<hr>'), 5)
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+        response = self.client.get(
+            reverse('posts:group_fragments', args=(self.group.slug,)),
+            {'format': 'json'},
+        )
+        data = response.json()
+        self.assertEqual(len(data['items']), 10)
+        self.assertIsNotNone(data['next_cursor'])
+
+        self.assertRedirects(
+            self.client.get(reverse('posts:follow_fragments')),
+            reverse('users:login') + '?next='
+            + reverse('posts:follow_fragments'),
+        )
+        # bulk_create не раскладывает посты по лентам, в ленте подписок
+        # только пост из setUp.
+        response = self.follower_client.get(
+            reverse('posts:follow_fragments'), {'format': 'json'}
+        )
+        self.assertEqual(len(response.json()['items']), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadsTest(TransactionTestCase):
+    """Реплика — снимок тестовой базы в отдельном файле SQLite."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='writer')
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.replica_dir = tempfile.mkdtemp()
+        name = os.path.join(self.replica_dir, 'replica.sqlite3')
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [name])
+        connections.databases['replica'] = {
+            **connection.settings_dict, 'NAME': name
+        }
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        shutil.rmtree(self.replica_dir, ignore_errors=True)
+
+    def texts(self, client):
+        response = client.get(reverse('posts:index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_user_reads_own_write_while_replica_lags(self):
+        """Автор сразу видит свой пост, остальные читают реплику,
+        когда окно после изменения ленты прошло."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(
+            reverse('posts:post_create'), data={'text': 'Новый пост'}
+        )
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, author_client.cookies)
+
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(self.texts(self.client), ['Старый пост'])
+        self.assertEqual(
+            self.texts(author_client), ['Новый пост', 'Старый пост']
+        )
+
+    def test_fresh_changes_not_served_from_replica(self):
+        """Сразу после записи лента для всех читается с основной базы,
+        а ETag не закрепляет ответ отстающей реплики."""
+        etag = self.client.get(reverse('posts:index'))['ETag']
+        Post.objects.create(author=self.author, text='Новый пост')
+
+        self.assertEqual(
+            self.texts(self.client), ['Новый пост', 'Старый пост']
+        )
+        response = self.client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
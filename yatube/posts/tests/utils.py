@@ -2,17 +2,19 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
 def create_post_with_photo(self):
-    small_gif = (
-        b'\x47\x49\x46\x38\x39\x61\x01\x00'
-        b'\x01\x00\x00\x00\x00\x21\xf9\x04'
-        b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
-        b'\x00\x00\x01\x00\x01\x00\x00\x02'
-        b'\x02\x4c\x01\x00\x3b'
-    )
     uploaded = SimpleUploadedFile(
         name='small.gif',
-        content=small_gif,
+        content=SMALL_GIF,
         content_type='image/gif',
     )
 
@@ -0,0 +1,167 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post, Thumbnail
+
+logger = logging.getLogger(__name__)
+
+# Ширины адаптивных вариантов картинки поста, пропорции 960x339.
+RESPONSIVE_WIDTHS = (480, 768, 960)
+ASPECT_RATIO = 339 / 960
+# Современные форматы отдаются через <source>, JPEG — запасной <img>.
+# AVIF не поддерживается sorl-thumbnail 12.x.
+MODERN_FORMATS = ('WEBP',)
+FALLBACK_FORMAT = 'JPEG'
+
+
+def variant_spec(width, image_format):
+    geometry = f'{width}x{round(width * ASPECT_RATIO)}'
+    options = {'crop': 'center', 'upscale': True, 'format': image_format}
+    return geometry, options
+
+
+# Все миниатюры, которые запрашивают шаблоны. Геометрия и опции должны
+# совпадать с отрисовкой, иначе sorl построит миниатюру заново.
+THUMBNAIL_SPECS = tuple(
+    variant_spec(width, image_format)
+    for image_format in MODERN_FORMATS + (FALLBACK_FORMAT,)
+    for width in RESPONSIVE_WIDTHS
+)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def spec_key(geometry, options):
+    return f'{geometry}:{options["format"]}'
+
+
+# Варианты картинок, уже прочитанные этим процессом. Имена картинок
+# адресуются содержимым, поэтому варианты по имени не устаревают.
+_variants = OrderedDict()
+_variants_lock = threading.Lock()
+
+
+def _remember(source, variants):
+    with _variants_lock:
+        _variants[source] = variants
+        _variants.move_to_end(source)
+        while len(_variants) > settings.THUMBNAIL_LRU_SIZE:
+            _variants.popitem(last=False)
+
+
+def _recall(source):
+    with _variants_lock:
+        variants = _variants.get(source)
+        if variants is not None:
+            _variants.move_to_end(source)
+        return variants
+
+
+def _collect(rows):
+    """Варианты из строк Thumbnail или None, если набор неполный."""
+    by_spec = {row.spec: row for row in rows}
+    variants = {}
+    for geometry, options in THUMBNAIL_SPECS:
+        row = by_spec.get(spec_key(geometry, options))
+        if row is None:
+            return None
+        variants.setdefault(options['format'], []).append(
+            (default.storage.url(row.name), row.width)
+        )
+    return variants
+
+
+def build_variants(source):
+    """Строит миниатюры через sorl и запоминает их в Thumbnail."""
+    image = ImageFile(source, storage=Post._meta.get_field('image').storage)
+    rows = []
+    for geometry, options in THUMBNAIL_SPECS:
+        thumbnail = get_thumbnail(image, geometry, **options)
+        rows.append(Thumbnail(
+            source=source,
+            spec=spec_key(geometry, options),
+            name=thumbnail.name,
+            width=thumbnail.width,
+        ))
+    Thumbnail.objects.bulk_create(rows, ignore_conflicts=True)
+    variants = _collect(rows)
+    _remember(source, variants)
+    return variants
+
+
+def prefetch_variants(sources):
+    """Загружает варианты всех картинок страницы одним запросом."""
+    missing = {source for source in sources if _recall(source) is None}
+    if not missing:
+        return
+    rows = {}
+    for row in Thumbnail.objects.filter(source__in=missing):
+        rows.setdefault(row.source, []).append(row)
+    for source, source_rows in rows.items():
+        variants = _collect(source_rows)
+        if variants is not None:
+            _remember(source, variants)
+
+
+def responsive_variants(source):
+    """Миниатюры картинки по форматам: {'WEBP': [(url, width), ...]}."""
+    variants = _recall(source)
+    if variants is None:
+        prefetch_variants([source])
+        variants = _recall(source)
+    if variants is None:
+        variants = build_variants(source)
+    return variants
+
+
+def forget(source):
+    """Забывает миниатюры удалённой картинки."""
+    with _variants_lock:
+        _variants.pop(source, None)
+    Thumbnail.objects.filter(source=source).delete()
+
+
+def generate_thumbnails(source):
+    """Строит все миниатюры картинки, вызывается вне цикла запроса."""
+    try:
+        build_variants(source)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры для %s', source)
+
+
+def generate_in_worker(source):
+    """generate_thumbnails для потока пула: закрывает его соединения."""
+    try:
+        generate_thumbnails(source)
+    finally:
+        connections.close_all()
+
+
+def schedule_thumbnails(post):
+    """Ставит построение миниатюр поста в пул после коммита транзакции."""
+    if not post.image:
+        return
+    name = post.image.name
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: generate_thumbnails(name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_in_worker, name)
+    )
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import CelebrityAuthor, Follow, Post, TimelineEntry
+from .utils import Feed, FeedPart
+
+
+def is_celebrity(author_id):
+    return CelebrityAuthor.objects.filter(author_id=author_id).exists()
+
+
+def push_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def push_posts(posts):
+    """Раскладывает пачку новых постов: подписчики всех авторов пачки
+    выбираются одним запросом."""
+    author_ids = {post.author_id for post in posts}
+    author_ids -= set(CelebrityAuthor.objects.filter(
+        author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+    if not author_ids:
+        return
+    followers = defaultdict(list)
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in=author_ids
+    ).values_list('author_id', 'user_id').iterator():
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for post in posts
+            for user_id in followers[post.author_id]
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту новые подписки все посты автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def get_timeline(user):
+    """Домашняя лента пользователя как Feed.
+
+    Разложенная часть читается диапазоном по индексу
+    (user, -pub_date, -post) без сортировки. Посты авторов-знаменитостей,
+    на которых подписан пользователь, подмешиваются при чтении: каждый
+    автор — своя часть ленты по индексу (author, -pub_date, -id).
+    """
+    entries = FeedPart(
+        TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ),
+        id_field='post_id',
+        post=attrgetter('post'),
+    )
+    celebrity_ids = Follow.objects.filter(
+        user=user, author__celebrity__isnull=False
+    ).values_list('author_id', flat=True)
+    return Feed(entries, *(
+        Post.objects.feed().filter(author_id=author_id)
+        for author_id in celebrity_ids
+    ))
+
+
+def reclassify_authors(threshold=None):
+    """Пересчитывает, кого из авторов раскладывать при публикации.
+
+    Возвращает пару (число повышенных, число пониженных авторов).
+    """
+    if threshold is None:
+        threshold = settings.TIMELINE_FANOUT_THRESHOLD
+    heavy = dict(
+        Follow.objects.values('author_id').annotate(
+            followers=Count('id')
+        ).filter(
+            followers__gte=threshold
+        ).values_list('author_id', 'followers')
+    )
+    current = set(
+        CelebrityAuthor.objects.values_list('author_id', flat=True)
+    )
+
+    promoted = heavy.keys() - current
+    CelebrityAuthor.objects.bulk_create(
+        CelebrityAuthor(author_id=author_id, followers_count=heavy[author_id])
+        for author_id in promoted
+    )
+    TimelineEntry.objects.filter(post__author_id__in=promoted).delete()
+
+    demoted = current - heavy.keys()
+    CelebrityAuthor.objects.filter(author_id__in=demoted).delete()
+    for follow in Follow.objects.filter(author_id__in=demoted).iterator():
+        backfill(follow.user_id, follow.author_id)
+
+    for author_id in heavy.keys() & current:
+        CelebrityAuthor.objects.filter(author_id=author_id).update(
+            followers_count=heavy[author_id]
+        )
+    return len(promoted), len(demoted)
@@ -0,0 +1,86 @@
+import os
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, которые сохраняются с тем же кодеком после уменьшения.
+RESAVE_FORMATS = {'JPEG': 'JPEG', 'MPO': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP'}
+
+
+def read_size(upload):
+    """Ширина и высота из заголовка файла, без декодирования пикселей.
+
+    Не картинка и картинка, размеры которой Pillow отказывается даже
+    открывать, отклоняются той же ошибкой, что у forms.ImageField.
+    """
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            return image.size
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise forms.ValidationError(
+            forms.ImageField.default_error_messages['invalid_image'],
+            code='invalid_image',
+        )
+    finally:
+        upload.seek(0)
+
+
+def check_limits(upload):
+    """Отклоняет файл по байтам и по размерам из заголовка."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise forms.ValidationError(
+            'Файл не должен быть больше %(limit)s МБ.',
+            code='too_big',
+            params={'limit': settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    width, height = read_size(upload)
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise forms.ValidationError(
+            'Картинка не должна быть больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+        )
+
+
+def shrink(upload):
+    """Уменьшает слишком большой оригинал и вырезает EXIF.
+
+    Результат пишется во временный файл на диске, а не в память.
+    Если менять нечего, возвращает исходный файл.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    image = Image.open(upload)
+    oversized = max(image.size) > max_side
+    image_format = RESAVE_FORMATS.get(image.format)
+    if getattr(image, 'is_animated', False) and oversized:
+        raise forms.ValidationError(
+            'Анимированная картинка не должна быть больше '
+            '%(limit)s пикселей по стороне.',
+            code='animated_too_large',
+            params={'limit': max_side},
+        )
+    if (
+        image_format is None
+        or getattr(image, 'is_animated', False)
+        or not (oversized or 'exif' in image.info)
+    ):
+        upload.seek(0)
+        return upload
+
+    if oversized:
+        # Для JPEG декодер сразу уменьшает картинку в 2-8 раз.
+        image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+
+    processed = TemporaryUploadedFile(
+        upload.name, upload.content_type, 0, None
+    )
+    image.save(processed, format=image_format)
+    processed.size = os.path.getsize(processed.temporary_file_path())
+    processed.seek(0)
+    return processed
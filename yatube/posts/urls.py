@@ -5,8 +5,19 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('fragments/', views.index_fragments, name='index_fragments'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/fragments/',
+        views.group_fragments,
+        name='group_fragments'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/fragments/',
+        views.profile_fragments,
+        name='profile_fragments'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
@@ -15,7 +26,14 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path('search/', views.search, name='search'),
+    path('export/<str:kind>/', views.export, name='export'),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'follow/fragments/',
+        views.follow_fragments,
+        name='follow_fragments'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,10 +1,398 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
+import heapq
+import itertools
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage, Page, PageNotAnInteger, Paginator
+)
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import POSTS, get_versions, pin_if_recent
 
 MAX_POSTS_ON_PAGE = 10
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW = 2
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+# Наибольший id, который поместится в целочисленную колонку базы.
+MAX_ID = 2 ** 63 - 1
+
+
+def feed_position(post):
+    """Ключ (pub_date, id) поста: объекта модели или строки .values()."""
+    if isinstance(post, dict):
+        return post['pub_date'], post['id']
+    return post.pub_date, post.pk
+
+
+def encode_token(*parts):
+    """Непрозрачный токен из частей, разделённых '|'."""
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Части токена encode_token, для испорченного токена вернёт None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def parse_id(value):
+    """id из токена; ValueError, если он не поместится в колонку базы."""
+    pk = int(value)
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(f'id вне допустимого диапазона: {pk}')
+    return pk
+
+
+def encode_cursor(post, direction=CURSOR_NEXT):
+    """Упаковывает позицию поста в ленте в непрозрачный токен.
+
+    Пост — объект модели или строка .values() с ключами pub_date и id.
+    """
+    pub_date, pk = feed_position(post)
+    return encode_token(direction, pub_date.isoformat(), pk)
+
+
+def decode_cursor(token):
+    """Разбирает токен курсора, для испорченного токена вернёт None."""
+    parts = decode_token(token)
+    if parts is None or len(parts) != 3:
+        return None
+    direction, pub_date, pk = parts
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        return None
+    try:
+        return direction, datetime.fromisoformat(pub_date), parse_id(pk)
+    except ValueError:
+        return None
+
+
+class FeedPart:
+    """Часть ленты: queryset, его поля ключа (дата, id поста)
+    и как получить пост из строки queryset.
+
+    Ключ должен совпадать с (pub_date, id) поста, а по полям ключа
+    должен быть индекс, иначе страницы читаются не диапазоном.
+    """
+
+    def __init__(self, queryset, date_field='pub_date', id_field='id',
+                 post=None):
+        self.queryset = queryset
+        self.date_field = date_field
+        self.id_field = id_field
+        self.post = post or (lambda row: row)
+
+    def newest(self, descending=True):
+        sign = '-' if descending else ''
+        return self.queryset.order_by(
+            f'{sign}{self.date_field}', f'{sign}{self.id_field}'
+        )
+
+    def rows_after(self, pub_date, pk):
+        """Строки после позиции.
+
+        Ведущее условие по дате позволяет базе начать диапазон
+        по индексу с позиции курсора, а не с начала ленты.
+        """
+        date, pk_field = self.date_field, self.id_field
+        return self.newest().filter(
+            Q(**{f'{date}__lte': pub_date})
+            & (Q(**{f'{date}__lt': pub_date}) | Q(**{f'{pk_field}__lt': pk}))
+        )
+
+    def rows_before(self, pub_date, pk):
+        """Строки перед позицией, ближайшие первыми."""
+        date, pk_field = self.date_field, self.id_field
+        return self.newest(descending=False).filter(
+            Q(**{f'{date}__gte': pub_date})
+            & (Q(**{f'{date}__gt': pub_date}) | Q(**{f'{pk_field}__gt': pk}))
+        )
+
+
+class Feed:
+    """Лента из частей, каждая читается по своему индексу.
+
+    Страница — это не больше limit строк из каждой части, слитых
+    по (pub_date, id) в Python. Для пагинатора Django лента умеет
+    count() и срезы; лента из одной части режется в базе через OFFSET.
+    """
+    ordered = True
+
+    def __init__(self, *parts):
+        self.parts = [
+            part if isinstance(part, FeedPart) else FeedPart(part)
+            for part in parts
+        ]
+
+    @property
+    def query(self):
+        """SQL частей, годится для ключа кэша."""
+        return ' UNION ALL '.join(
+            str(part.queryset.query) for part in self.parts
+        )
+
+    def count(self):
+        return sum(part.queryset.count() for part in self.parts)
+
+    def __len__(self):
+        return self.count()
+
+    def _merge(self, querysets, limit, descending=True):
+        rows = heapq.merge(
+            *(
+                [part.post(row) for row in queryset[:limit]]
+                for part, queryset in querysets
+            ),
+            key=feed_position,
+            reverse=descending,
+        )
+        return list(itertools.islice(rows, limit))
+
+    def newest(self, limit):
+        return self._merge(
+            [(part, part.newest()) for part in self.parts], limit
+        )
+
+    def after(self, position, limit):
+        return self._merge(
+            [(part, part.rows_after(*position)) for part in self.parts],
+            limit,
+        )
+
+    def before(self, position, limit):
+        """Ближайшие limit строк перед позицией, по возрастанию."""
+        return self._merge(
+            [(part, part.rows_before(*position)) for part in self.parts],
+            limit,
+            descending=False,
+        )
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step:
+            raise TypeError('Ленту можно только резать срезом без шага')
+        start, stop = key.start or 0, key.stop
+        if len(self.parts) == 1:
+            part = self.parts[0]
+            return [part.post(row) for row in part.newest()[start:stop]]
+        return self.newest(stop)[start:]
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница — это выборка per_page + 1 строк от позиции курсора,
+    поэтому стоимость запроса не зависит от глубины прокрутки.
+    Принимает queryset или Feed из нескольких частей.
+    """
+
+    def __init__(self, object_list, per_page):
+        if not isinstance(object_list, Feed):
+            object_list = Feed(object_list)
+        super().__init__(object_list, per_page)
+
+    def get_cursor_page(self, token):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._page_after(None)
+        direction, pub_date, pk = cursor
+        if direction == CURSOR_PREVIOUS:
+            return self._page_before((pub_date, pk))
+        return self._page_after((pub_date, pk))
+
+    def _page_after(self, position):
+        if position is None:
+            rows = self.object_list.newest(self.per_page + 1)
+        else:
+            rows = self.object_list.after(position, self.per_page + 1)
+        return CursorPage(
+            rows[:self.per_page],
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=position is not None,
+        )
+
+    def _page_before(self, position):
+        rows = self.object_list.before(position, self.per_page + 1)
+        return CursorPage(
+            rows[:self.per_page][::-1],
+            self,
+            has_next=True,
+            has_previous=len(rows) > self.per_page,
+        )
+
+
+class CursorPage(Page):
+    """Страница курсорной ленты: знает только соседей, но не номер."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return encode_cursor(self.object_list[-1], CURSOR_NEXT)
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return encode_cursor(self.object_list[0], CURSOR_PREVIOUS)
+
+
+def page_window(number, last):
+    """Первая, последняя и PAGE_WINDOW страниц вокруг текущей.
+
+    None в списке — пропуск, в шаблоне рисуется многоточием.
+    """
+    numbers = sorted({1, last, *range(
+        max(1, number - PAGE_WINDOW), min(last, number + PAGE_WINDOW) + 1
+    )})
+    window = []
+    for previous, current in zip([0] + numbers, numbers):
+        if current - previous > 1:
+            window.append(None)
+        window.append(current)
+    return window
+
+
+class EstimatedCountPaginator(Paginator):
+    """Номерной пагинатор без COUNT(*) на каждой странице.
+
+    Число строк берётся из подсказки count_hint (денормализованный
+    счётчик или статистика базы), иначе из кэша по count_key, а при
+    промахе считается точно и кэшируется. Любое из этих чисел может
+    отстать от таблицы, поэтому страница выбирает per_page + 1 строк
+    и поправляет count, если за ней есть ещё строки или она последняя;
+    за пределами таблицы count считается точно.
+    """
+
+    def __init__(self, object_list, per_page, count_hint=None,
+                 count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_hint = count_hint
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_hint is not None:
+            return self.count_hint
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_key, count, settings.FEED_CACHE_TIMEOUT)
+        return count
+
+    def _correct_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        # Страницы за оценкой могут существовать, проверит page().
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не целое число')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            self.count_hint = self.count_key = None
+            self.__dict__.pop('count', None)
+            self.__dict__.pop('num_pages', None)
+            return self.page(self.num_pages)
+        if len(rows) > self.per_page:
+            self._correct_count(max(self.count, bottom + len(rows)))
+        else:
+            self._correct_count(bottom + len(rows))
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.page_window = page_window(number, self.num_pages)
+        return page
+
+
+def estimated_rows(model):
+    """Число строк таблицы по статистике планировщика без COUNT(*).
+
+    None, если статистики нет или таблица меньше
+    ESTIMATED_COUNT_MIN_ROWS: такую дешевле посчитать точно.
+    """
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    rows = None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table],
+                )
+                row = cursor.fetchone()
+                rows = int(row[0].split()[0]) if row else None
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s', [table]
+            )
+            row = cursor.fetchone()
+            rows = int(row[0]) if row and row[0] >= 0 else None
+    if rows is None or rows < settings.ESTIMATED_COUNT_MIN_ROWS:
+        return None
+    return rows
+
 
+def get_page_context(queryset, request, count_hint=None, count_scopes=None):
+    """Страница ленты: курсорная для ?cursor=, номерная для ?page=.
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, MAX_POSTS_ON_PAGE)
+    Точное число постов номерной ленты кэшируется до смены поколений
+    областей count_scopes (по умолчанию любой пост), count_hint
+    заменяет его оценкой.
+    """
+    if 'cursor' in request.GET:
+        paginator = CursorPaginator(queryset, MAX_POSTS_ON_PAGE)
+        return paginator.get_cursor_page(request.GET.get('cursor'))
+    scopes = count_scopes or [POSTS]
+    query = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    versions = get_versions(*scopes)
+    pin_if_recent(versions)
+    versions = ':'.join(str(version) for version in versions)
+    paginator = EstimatedCountPaginator(
+        queryset,
+        MAX_POSTS_ON_PAGE,
+        count_hint=count_hint,
+        count_key=f'feed_count:{query}:{versions}',
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
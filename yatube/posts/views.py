@@ -1,22 +1,43 @@
 from django.contrib.auth.models import User
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from .forms import PostForm, CommentForm
 from .models import Post, Group, Follow
 from django.contrib.auth.decorators import login_required
-from .utils import get_page_context
+from .conditional import (
+    conditional_page, follow_scopes, group_scopes, index_scopes,
+    post_scopes, profile_scopes
+)
+from .export import EXPORTS, FORMATS, parse_bound, stream_export
+from .search import find_posts
+from .templatetags.post_fragments import post_fragments
+from .thumbnails import schedule_thumbnails
+from .timeline import get_timeline
+from .cache import POSTS, follow_scope
+from .utils import (
+    MAX_POSTS_ON_PAGE, CursorPaginator, EstimatedCountPaginator,
+    estimated_rows, get_page_context
+)
 
 
+@conditional_page(index_scopes)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.feed()
     context = {
-        'page_obj': get_page_context(post_list, request)
+        'page_obj': get_page_context(
+            post_list, request, count_hint=estimated_rows(Post)
+        )
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.feed()
     context = {
         'group': group,
         'page_obj': get_page_context(post_list, request)
@@ -24,25 +45,36 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.feed()
     following = True
     if request.user.is_authenticated:
         following = request.user.follower.filter(author=author).exists()
 
+    posts_count = author.stats.posts_count if hasattr(
+        author, 'stats'
+    ) else None
     context = {
         'author': author,
-        'page_obj': get_page_context(post_list, request),
+        'page_obj': get_page_context(
+            post_list, request, count_hint=posts_count
+        ),
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
-    post = Post.objects.get(id=post_id)
+    post = Post.objects.feed().select_related('author__stats').get(
+        id=post_id
+    )
     comment_form = CommentForm()
-    comments = post.comments.select_related('post')
+    comments = post.comments.select_related('author')
     context = {
         'post': post,
         'comments': comments,
@@ -51,6 +83,97 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def feed_fragment(request, post_list, not_profile_page=True,
+                  is_group_page=False):
+    """Следующая пачка постов ленты по курсору без обвязки страницы.
+
+    По умолчанию — HTML отрисованных постов, курсор продолжения
+    в заголовке X-Next-Cursor; с ?format=json — те же фрагменты и курсор
+    в JSON.
+    """
+    page_obj = CursorPaginator(post_list, MAX_POSTS_ON_PAGE).get_cursor_page(
+        request.GET.get('cursor')
+    )
+    fragments = post_fragments(page_obj, not_profile_page, is_group_page)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'items': fragments,
+            'next_cursor': page_obj.next_cursor,
+        })
+    response = render(
+        request, 'posts/includes/feed_batch.html', {'fragments': fragments}
+    )
+    response['X-Next-Cursor'] = page_obj.next_cursor or ''
+    return response
+
+
+@conditional_page(index_scopes)
+def index_fragments(request):
+    return feed_fragment(request, Post.objects.feed())
+
+
+@conditional_page(group_scopes)
+def group_fragments(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_fragment(request, group.posts.feed(), is_group_page=True)
+
+
+@conditional_page(profile_scopes)
+def profile_fragments(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_fragment(
+        request, author.posts.feed(), not_profile_page=False
+    )
+
+
+@login_required
+@conditional_page(follow_scopes)
+def follow_fragments(request):
+    return feed_fragment(request, get_timeline(request.user))
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_ids = find_posts(query) if query else []
+    paginator = EstimatedCountPaginator(post_ids, MAX_POSTS_ON_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export(request, kind):
+    """Потоковая выгрузка постов или комментариев, см. posts.export."""
+    if kind not in EXPORTS:
+        raise Http404
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат')
+    try:
+        since = parse_bound(request.GET.get('since'))
+        until = parse_bound(request.GET.get('until'))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    _, content_type = FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream_export(kind, export_format, since, until),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    extension = 'csv' if export_format == 'csv' else 'jsonl'
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}.{extension}"'
+    )
+    return response
+
+
 @login_required()
 def post_create(request):
     create_form = PostForm(
@@ -61,6 +184,7 @@ def post_create(request):
         post: Post = create_form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post)
         return redirect('posts:profile', request.user)
     context = {
         'form': create_form,
@@ -81,6 +205,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post.id)
     form = PostForm(instance=post)
     context = {
@@ -103,10 +229,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_page(follow_scopes)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = get_timeline(request.user)
     context = {
-        'page_obj': get_page_context(post_list, request),
+        'page_obj': get_page_context(
+            post_list, request,
+            count_scopes=[POSTS, follow_scope(request.user.pk)],
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -0,0 +1,52 @@
+// Догрузка ленты при прокрутке, см. posts/includes/feed_loader.html.
+(function () {
+  'use strict';
+
+  var sentinel = document.querySelector('[data-feed-more]');
+  if (!sentinel || !('IntersectionObserver' in window)) {
+    return;
+  }
+  var pager = document.querySelector('nav[aria-label="Page navigation"]');
+  if (pager) {
+    pager.hidden = true;
+  }
+  var loading = false;
+
+  function loadMore() {
+    var cursor = sentinel.dataset.cursor;
+    if (loading || !cursor) {
+      return;
+    }
+    loading = true;
+    var url = sentinel.dataset.feedMore + '?cursor=' + encodeURIComponent(cursor);
+    fetch(url, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status);
+        }
+        sentinel.dataset.cursor = response.headers.get('X-Next-Cursor') || '';
+        return response.text();
+      })
+      .then(function (html) {
+        sentinel.insertAdjacentHTML('beforebegin', html);
+        loading = false;
+        if (!sentinel.dataset.cursor) {
+          observer.disconnect();
+        }
+      })
+      .catch(function () {
+        // Ошибка сети: возвращаем обычную навигацию по страницам.
+        observer.disconnect();
+        if (pager) {
+          pager.hidden = false;
+        }
+      });
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) {
+      loadMore();
+    }
+  }, {rootMargin: '600px'});
+  observer.observe(sentinel);
+})();
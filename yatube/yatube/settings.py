@@ -10,11 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import json
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# manage.py test или pytest: фоновые потоки, переживающие тест, по умолчанию
+# выключены, иначе они пишут в базу и в MEDIA_ROOT после их очистки.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -46,12 +52,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -102,13 +110,52 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединения (см. core.db): CONN_MAX_AGE > 0 держит соединение потока
+# между запросами, CONN_HEALTH_CHECKS проверяет его в начале запроса.
+# Бэкенды core.db.backends.sqlite3 и core.db.backends.postgresql берут
+# соединения из пула процесса с настройками POOL, с ними CONN_MAX_AGE = 0.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': os.getenv('YATUBE_DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'USER': os.getenv('YATUBE_DB_USER', ''),
+        'PASSWORD': os.getenv('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.getenv('YATUBE_DB_HOST', ''),
+        'PORT': os.getenv('YATUBE_DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('YATUBE_DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.getenv('YATUBE_DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('YATUBE_DB_POOL_TIMEOUT', 30)),
+            'CHECK_AFTER': float(os.getenv('YATUBE_DB_POOL_CHECK_AFTER', 30)),
+        },
     }
 }
 
+# Реплики для чтения (core.db.routers): JSON вида
+# {"replica": {"HOST": "replica-1"}} или для SQLite {"replica": {"NAME": ...}},
+# недостающие ключи берутся из основной базы. В тестах реплика — зеркало
+# основной базы.
+DATABASE_REPLICAS = []
+for alias, overrides in json.loads(
+    os.getenv('YATUBE_DB_REPLICAS', '{}')
+).items():
+    DATABASES[alias] = {
+        **DATABASES['default'], **overrides, 'TEST': {'MIRROR': 'default'}
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.db.routers.PrimaryReplicaRouter']
+# Набор PRAGMA для соединений SQLite из core.db.sqlite.PROFILES:
+# 'production' (WAL, mmap, busy timeout) или 'default' — как есть.
+SQLITE_PROFILE = os.getenv('YATUBE_SQLITE_PROFILE', 'production')
+# Сколько секунд после записи пользователь читает из основной базы,
+# должно быть больше отставания реплик.
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'pin_primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -155,8 +202,68 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для всех воркеров кэш задаётся окружением, например
+# YATUBE_CACHE_BACKEND=django_redis.cache.RedisCache
+# YATUBE_CACHE_LOCATION=redis://127.0.0.1:6379/1
+# или FileBasedCache с каталогом на локальной машине.
+# YATUBE_CACHE_VERSION сбрасывает все ключи при несовместимом релизе.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.getenv(
+            'YATUBE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', ''),
+        'KEY_PREFIX': 'yatube',
+        'VERSION': int(os.getenv('YATUBE_CACHE_VERSION', 1)),
     }
 }
+
+# Ключи фрагментов постов меняются вместе с постом, а поколения
+# posts.cache сбрасываются сигналами, поэтому срок жизни может быть большим.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько секунд обратный прокси может отдавать анонимам ленты
+# без перепроверки (Cache-Control: s-maxage, см. posts.conditional).
+FEED_HTTP_MAX_AGE = 60
+
+# Авторы, у которых подписчиков не меньше порога, не раскладываются
+# по лентам при публикации (см. posts.timeline и reclassify_authors).
+TIMELINE_FANOUT_THRESHOLD = 10000
+
+# Потоки, которые строят миниатюры загруженных картинок после коммита
+# (posts.thumbnails). 0 — строить сразу после коммита в потоке запроса;
+# так по умолчанию под тестами.
+THUMBNAIL_WORKERS = int(
+    os.getenv('YATUBE_THUMBNAIL_WORKERS', 0 if TESTING else 2)
+)
+# Сколько наборов миниатюр каждый процесс держит в памяти.
+THUMBNAIL_LRU_SIZE = 1024
+
+# Ограничения на картинки постов (posts.uploads). Больше байт или пикселей
+# не принимаем, оригиналы с большей стороной уменьшаем.
+POST_IMAGE_MAX_BYTES = 10 * 2 ** 20
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 2560
+
+# Движок поиска (posts.search): 'fts5' — виртуальная таблица SQLite,
+# 'python' — обратный индекс в таблицах приложения, 'auto' — FTS5,
+# если миграция смогла создать таблицу.
+SEARCH_BACKEND = os.getenv('YATUBE_SEARCH_BACKEND', 'auto')
+# Сколько лучших результатов поиска листает пагинатор.
+SEARCH_MAX_RESULTS = 1000
+# Записи постов и комментариев ставят пост в очередь SearchQueue, её пачками
+# разбирает фоновый поток процесса, выждав SEARCH_INDEX_DELAY секунд.
+# 0 — переиндексировать сразу в сигнале; так по умолчанию под тестами.
+SEARCH_INDEX_WRITE_BEHIND = bool(int(
+    os.getenv('YATUBE_SEARCH_INDEX_WRITE_BEHIND', 0 if TESTING else 1)
+))
+SEARCH_INDEX_DELAY = 1
+SEARCH_INDEX_BATCH_SIZE = 500
+
+# Потоки, в которых ASGI-вход (yatube/asgi.py) выполняет представления.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
+
+# Таблицы меньше этого числа строк лента считает точно, а не по статистике
+# планировщика (posts.utils.estimated_rows).
+ESTIMATED_COUNT_MIN_ROWS = 10000
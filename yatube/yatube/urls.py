@@ -5,11 +5,15 @@ from django.urls import path, include
 from django.conf import settings
 import debug_toolbar
 
+from core.views import db_pool_stats
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls')),
+    path('api/', include('api.urls', namespace='api')),
+    path('health/db/', db_pool_stats, name='db_pool_stats'),
     path('', include('posts.urls', namespace='posts')),
 ]
 